@@ -3,17 +3,209 @@ import streamlit as st
 import sqlite3
 import pandas as pd
 import plotly.express as px
-from datetime import datetime
+from datetime import datetime, time, timedelta
+from typing import NamedTuple
 import os
+import hashlib
+import hmac
+import threading
+from contextlib import contextmanager
+from PIL import Image
+
+ICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "gear.png")
+
+@st.cache_resource(show_spinner=False)
+def _icon():
+    """페이지 아이콘 (프로세스당 한 번만 로드, 파일이 없으면 이모지)"""
+    try:
+        return Image.open(ICON_PATH)
+    except OSError:
+        return "⚙️"
 
 # 🎨 Streamlit 페이지 설정
 st.set_page_config(
     page_title="관리자 포털",
-    page_icon="⚙️",
+    page_icon=_icon(),
     layout="wide"
 )
 
+DB_PATH = 'compressor_system.db'
+FILES_PAGE_SIZE = 50
+
+class Stats(NamedTuple):
+    """대시보드 통계"""
+    total_customers: int
+    total_files: int
+    today_diagnoses: int
+    model_accuracy: float
+
+class Activity(NamedTuple):
+    """최근 활동 항목"""
+    ts: str
+    description: str
+
+@st.cache_resource(show_spinner=False)
+def get_conn():
+    """프로세스 전체에서 공유하는 SQLite 연결"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # 읽기 위주 대시보드용 튜닝 (WAL: 읽기/쓰기 동시 진행)
+    conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA busy_timeout=10000;
+        PRAGMA cache_size=-64000;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+    """)
+    
+    # 관리자 활동 로그 (관리자 포털 전용 테이블)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS activities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            description TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_activities_ts ON activities(ts DESC);
+        
+        -- 고객 ID 발급용 단조 증가 카운터 (삭제 후에도 번호 재사용 없음)
+        CREATE TABLE IF NOT EXISTS id_sequences (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """)
+    
+    # 대시보드 조회용 인덱스 (테이블은 메인 시스템에서 생성)
+    for index_sql in (
+        "CREATE INDEX IF NOT EXISTS idx_audio_upload ON audio_files(upload_time DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_audio_customer ON audio_files(customer_id)",
+        "CREATE INDEX IF NOT EXISTS idx_customers_company ON customers(company_name)",
+    ):
+        try:
+            conn.execute(index_sql)
+        except sqlite3.OperationalError:
+            pass  # 테이블이 아직 없는 경우
+    conn.commit()
+    return conn
+
+@st.cache_resource(show_spinner=False)
+def db_write_lock():
+    """공유 연결(get_conn)의 쓰기 트랜잭션 직렬화용 락 (재진입 가능)"""
+    return threading.RLock()
+
+@st.cache_resource(show_spinner=False)
+def _get_read_conn():
+    """조회 전용 연결 + 락 (mode=ro, WAL이라 쓰기 트랜잭션과 서로 막지 않음)"""
+    get_conn()  # DB 파일/WAL 모드/인덱스 먼저 보장
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-64000")
+    return conn, threading.Lock()
+
+@contextmanager
+def read_conn():
+    """캐시된 통계/목록 조회용 읽기 전용 연결 (세션 간 공유, 사용 중에는 잠금)"""
+    conn, lock = _get_read_conn()
+    with lock:
+        yield conn
+
+@st.cache_resource(show_spinner=False)
+def _admin_hash():
+    """관리자 비밀번호 SHA-256 다이제스트 (st.secrets 미설정 시 기본 비밀번호)"""
+    try:
+        password = st.secrets["admin_password"]
+    except (KeyError, FileNotFoundError):
+        password = "admin123"
+    return hashlib.sha256(password.encode()).digest()
+
+def _db_mtime():
+    """캐시 키로 사용할 DB 파일 수정 시각"""
+    # WAL 모드에서는 체크포인트 전까지 변경 내용이 -wal 파일에만 기록됨
+    mtime = 0.0
+    for path in (DB_PATH, f"{DB_PATH}-wal"):
+        try:
+            mtime = max(mtime, os.path.getmtime(path))
+        except OSError:
+            pass
+    return mtime
+
+def _day_bounds(day):
+    """하루 구간 [당일 00:00, 익일 00:00) - upload_time 인덱스 범위 검색용"""
+    # SQLite CURRENT_TIMESTAMP 형식('YYYY-MM-DD HH:MM:SS')과 문자열 비교가 맞도록 공백 구분자 사용
+    start = datetime.combine(day, time.min)
+    end = start + timedelta(days=1)
+    return start.isoformat(sep=' '), end.isoformat(sep=' ')
+
+# 📦 조회 결과 캐시 (DB가 변경되면 mtime 키가 바뀌어 자동 무효화)
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _compute_stats(db_mtime: float) -> Stats:
+    """시스템 통계 계산"""
+    today_start, today_end = _day_bounds(datetime.now().date())
+    with read_conn() as conn:
+        total_customers, total_files, today_diagnoses = conn.execute(
+            """
+            SELECT
+                (SELECT COUNT(*) FROM customers),
+                (SELECT COUNT(*) FROM audio_files),
+                (SELECT COUNT(*) FROM audio_files
+                  WHERE upload_time >= ? AND upload_time < ?)
+            """,
+            (today_start, today_end)
+        ).fetchone()
+    
+    return Stats(total_customers, total_files, today_diagnoses, model_accuracy=0.85)
+
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _load_customers(db_mtime: float) -> pd.DataFrame:
+    """고객 목록 로드"""
+    with read_conn() as conn:
+        customers = pd.read_sql_query(
+            "SELECT * FROM customers ORDER BY company_name",
+            conn,
+            dtype_backend="pyarrow"
+        )
+    for column in ("company_name", "contact_person"):
+        customers[column] = customers[column].astype("category")
+    return customers
+
+@st.cache_data(ttl=60, max_entries=8, show_spinner=False)
+def _load_files_list(db_mtime: float, page: int, page_size: int) -> pd.DataFrame:
+    """파일 목록 로드 (페이지 단위)"""
+    with read_conn() as conn:
+        files = pd.read_sql_query("""
+            SELECT af.id, af.filename, af.upload_time, af.duration, af.sample_rate,
+                   af.customer_id, af.equipment_id, c.company_name
+            FROM audio_files af 
+            LEFT JOIN customers c ON af.customer_id = c.id 
+            ORDER BY af.upload_time DESC
+            LIMIT ? OFFSET ?
+        """, conn, params=(page_size, (page - 1) * page_size), dtype_backend="pyarrow")
+    if files.empty:
+        return files
+    # 전송량 축소: 반복 문자열은 범주형, 숫자는 작은 타입으로
+    for column in ("customer_id", "company_name"):
+        files[column] = files[column].astype("category")
+    for column, dtype in (("duration", "float32[pyarrow]"), ("sample_rate", "uint32[pyarrow]")):
+        if column in files:
+            files[column] = files[column].astype(dtype)
+    return files
+
+@st.cache_data(ttl=30, max_entries=4, show_spinner=False)
+def _load_recent_activities(db_mtime: float) -> list:
+    """최근 활동 로드"""
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT ts, description FROM activities ORDER BY ts DESC LIMIT 20"
+        ).fetchall()
+    return [Activity(*row) for row in rows]
+
 class AdminPortal:
+    # 고객 ID는 id_sequences 카운터로 발급 (같은 초에 여러 건 등록하거나 삭제 후에도 충돌/재사용 없음)
+    INSERT_CUSTOMER_SQL = """
+        INSERT INTO customers (id, company_name, contact_person, email, phone)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    
     def __init__(self):
         self.session_state = st.session_state
         self.init_session_state()
@@ -27,7 +219,7 @@ class AdminPortal:
     def init_database(self):
         """데이터베이스 초기화"""
         try:
-            self.conn = sqlite3.connect('compressor_system.db', check_same_thread=False)
+            get_conn()
         except Exception as e:
             st.error(f"데이터베이스 연결 오류: {e}")
     
@@ -42,7 +234,10 @@ class AdminPortal:
                 submit_button = st.form_submit_button("로그인")
                 
                 if submit_button:
-                    if username == "admin" and password == "admin123":
+                    password_ok = hmac.compare_digest(
+                        _admin_hash(), hashlib.sha256(password.encode()).digest()
+                    )
+                    if username == "admin" and password_ok:
                         self.session_state.admin_logged_in = True
                         st.success("관리자 로그인 성공!")
                         st.rerun()
@@ -73,6 +268,7 @@ class AdminPortal:
             self.session_state.admin_logged_in = False
             st.rerun()
     
+    @st.fragment
     def dashboard_tab(self):
         """대시보드 탭"""
         st.subheader("📊 시스템 대시보드")
@@ -83,23 +279,26 @@ class AdminPortal:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("총 고객 수", stats['total_customers'])
+            st.metric("총 고객 수", stats.total_customers)
         
         with col2:
-            st.metric("총 파일 수", stats['total_files'])
+            st.metric("총 파일 수", stats.total_files)
         
         with col3:
-            st.metric("오늘 진단 수", stats['today_diagnoses'])
+            st.metric("오늘 진단 수", stats.today_diagnoses)
         
         with col4:
-            st.metric("AI 모델 정확도", f"{stats['model_accuracy']:.1%}")
+            st.metric("AI 모델 정확도", f"{stats.model_accuracy:.1%}")
         
         # 최근 활동
         st.subheader("🕒 최근 활동")
         activities = self.get_recent_activities()
+        if not activities:
+            st.info("최근 활동이 없습니다.")
         for activity in activities:
-            st.write(f"• {activity['time']} - {activity['description']}")
+            st.write(f"• {activity.ts} - {activity.description}")
     
+    @st.fragment
     def customer_management_tab(self):
         """고객 관리 탭"""
         st.subheader("👥 고객 관리")
@@ -107,7 +306,12 @@ class AdminPortal:
         # 고객 목록
         customers = self.get_customers()
         if not customers.empty:
-            st.dataframe(customers, use_container_width=True)
+            st.dataframe(
+                customers[["company_name", "contact_person", "email", "phone"]],
+                hide_index=True,
+                use_container_width=True,
+                column_config={"email": st.column_config.TextColumn(width="medium")}
+            )
         else:
             st.info("등록된 고객이 없습니다.")
         
@@ -126,12 +330,17 @@ class AdminPortal:
                 else:
                     st.error("고객 등록에 실패했습니다.")
     
+    @st.fragment
     def data_management_tab(self):
         """데이터 관리 탭"""
         st.subheader("📁 데이터 관리")
         
         # 파일 목록
-        files = self.get_files_list()
+        total_files = self.get_system_stats().total_files
+        total_pages = max(1, -(-total_files // FILES_PAGE_SIZE))
+        page = st.number_input("페이지", min_value=1, max_value=total_pages, value=1)
+        
+        files = self.get_files_list(page)
         if not files.empty:
             st.dataframe(files, use_container_width=True)
         else:
@@ -146,6 +355,7 @@ class AdminPortal:
             else:
                 st.error(f"백업 실패: {result['error']}")
     
+    @st.fragment
     def system_settings_tab(self):
         """시스템 설정 탭"""
         st.subheader("⚙️ 시스템 설정")
@@ -173,70 +383,64 @@ class AdminPortal:
     def get_system_stats(self):
         """시스템 통계 조회"""
         try:
-            cursor = self.conn.execute("SELECT COUNT(*) FROM customers")
-            total_customers = cursor.fetchone()[0]
-            
-            cursor = self.conn.execute("SELECT COUNT(*) FROM audio_files")
-            total_files = cursor.fetchone()[0]
-            
-            today = datetime.now().date()
-            cursor = self.conn.execute(
-                "SELECT COUNT(*) FROM audio_files WHERE DATE(upload_time) = ?",
-                (today,)
-            )
-            today_diagnoses = cursor.fetchone()[0]
-            
-            return {
-                'total_customers': total_customers,
-                'total_files': total_files,
-                'today_diagnoses': today_diagnoses,
-                'model_accuracy': 0.85
-            }
+            return _compute_stats(_db_mtime())
         except Exception as e:
-            return {'total_customers': 0, 'total_files': 0, 'today_diagnoses': 0, 'model_accuracy': 0.0}
+            return Stats(0, 0, 0, 0.0)
     
     def get_customers(self):
         """고객 목록 조회"""
         try:
-            cursor = self.conn.execute("SELECT * FROM customers ORDER BY company_name")
-            columns = [description[0] for description in cursor.description]
-            data = cursor.fetchall()
-            return pd.DataFrame(data, columns=columns)
+            return _load_customers(_db_mtime())
         except Exception as e:
             return pd.DataFrame()
     
-    def get_files_list(self):
+    def get_files_list(self, page=1, page_size=FILES_PAGE_SIZE):
         """파일 목록 조회"""
         try:
-            cursor = self.conn.execute("""
-                SELECT af.*, c.company_name 
-                FROM audio_files af 
-                LEFT JOIN customers c ON af.customer_id = c.id 
-                ORDER BY af.upload_time DESC
-            """)
-            columns = [description[0] for description in cursor.description]
-            data = cursor.fetchall()
-            return pd.DataFrame(data, columns=columns)
+            return _load_files_list(_db_mtime(), page, page_size)
         except Exception as e:
             return pd.DataFrame()
     
     def get_recent_activities(self):
         """최근 활동 조회"""
-        return [
-            {"time": "10:30", "description": "새 고객 등록: ABC 회사"},
-            {"time": "09:15", "description": "파일 업로드: 5개 파일"},
-            {"time": "08:45", "description": "AI 모델 업데이트 완료"}
-        ]
+        try:
+            return _load_recent_activities(_db_mtime())
+        except Exception as e:
+            return []
     
     def add_customer(self, company_name, contact_person, email, phone):
         """고객 추가"""
         try:
-            customer_id = f"customer_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            cursor = self.conn.execute("""
-                INSERT INTO customers (id, company_name, contact_person, email, phone)
-                VALUES (?, ?, ?, ?, ?)
-            """, (customer_id, company_name, contact_person, email, phone))
-            self.conn.commit()
+            return self.add_customers_bulk([(company_name, contact_person, email, phone)])
+        except Exception as e:
+            return False
+    
+    @staticmethod
+    def _reserve_customer_ids(conn, count):
+        """고객 ID count개 예약 - 쓰기 트랜잭션 안에서 호출 (카운터 갱신이 다른 쓰기와 직렬화됨)"""
+        # 최초 1회: 기존 고객 rowid 이후부터 시작
+        conn.execute(
+            "INSERT OR IGNORE INTO id_sequences (name, value) "
+            "SELECT 'customers', IFNULL(MAX(rowid), 0) FROM customers"
+        )
+        conn.execute("UPDATE id_sequences SET value = value + ? WHERE name = 'customers'", (count,))
+        last = conn.execute("SELECT value FROM id_sequences WHERE name = 'customers'").fetchone()[0]
+        return [f"customer_{n}" for n in range(last - count + 1, last + 1)]
+    
+    def add_customers_bulk(self, rows):
+        """고객 일괄 추가 - rows: (company_name, contact_person, email, phone) 튜플 목록"""
+        try:
+            # 세션 간 공유 연결이므로 쓰기는 락으로 직렬화 (단일 트랜잭션, 성공 시 커밋/실패 시 롤백)
+            with db_write_lock(), get_conn() as conn:
+                ids = self._reserve_customer_ids(conn, len(rows))
+                conn.executemany(
+                    self.INSERT_CUSTOMER_SQL,
+                    [(customer_id, *row) for customer_id, row in zip(ids, rows)]
+                )
+                conn.executemany(
+                    "INSERT INTO activities (description) VALUES (?)",
+                    [(f"새 고객 등록: {row[0]}",) for row in rows]
+                )
             return True
         except Exception as e:
             return False
@@ -244,15 +448,19 @@ class AdminPortal:
     def backup_database(self):
         """데이터베이스 백업"""
         try:
-            import shutil
             backup_dir = "backups"
             os.makedirs(backup_dir, exist_ok=True)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = f"{backup_dir}/admin_backup_{timestamp}.db"
             
-            self.conn.commit()
-            shutil.copy2('compressor_system.db', backup_path)
+            # SQLite 온라인 백업 API (WAL 모드에서도 일관된 스냅샷)
+            dst = sqlite3.connect(backup_path)
+            try:
+                with read_conn() as conn:
+                    conn.backup(dst, pages=1024)
+            finally:
+                dst.close()
             
             return {'success': True, 'path': backup_path}
         except Exception as e:
@@ -267,7 +475,10 @@ class AdminPortal:
 
 def main():
     """메인 함수"""
-    portal = AdminPortal()
+    # 재실행마다 포털을 새로 만들지 않고 세션에 보관된 인스턴스 재사용
+    if 'portal' not in st.session_state:
+        st.session_state.portal = AdminPortal()
+    portal = st.session_state.portal
     portal.run()
 
 if __name__ == "__main__":
@@ -3,20 +3,53 @@ from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import sqlite3
+import queue
 import os
 import json
 import hashlib
+import hmac
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import aiofiles
 import jwt
 from datetime import datetime, timedelta
 import librosa
+import soundfile as sf
+from scipy.signal import resample_poly, get_window
+import scipy.fft
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 import pickle
-import requests
+import httpx
 import logging
 
+# 선택적 의존성: 트리 앙상블 네이티브 컴파일 (treelite + tl2cgen)
+try:
+    import treelite
+    import tl2cgen
+    TREE_COMPILER_AVAILABLE = True
+except ImportError:
+    TREE_COMPILER_AVAILABLE = False
+
+# 선택적 의존성: ONNX Runtime 추론 (treelite가 없을 때 사용)
+try:
+    import onnxruntime as ort
+    from skl2onnx import convert_sklearn
+    from skl2onnx.common.data_types import FloatTensorType
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+# 선택적 의존성: 특징 통계 JIT 컴파일 (numba)
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -42,6 +75,15 @@ SECRET_KEY = "your-secret-key-here"  # 실제 운영에서는 환경변수로 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# 비밀번호 해시 설정 (scrypt)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# SQLite 설정
+DB_PATH = "compressor_system.db"
+DB_POOL_SIZE = 8
+
 # 카카오톡 API 설정
 try:
     from kakao_config import KAKAO_CLIENT_ID, KAKAO_CLIENT_SECRET, KAKAO_REDIRECT_URI
@@ -52,18 +94,25 @@ except ImportError:
 
 security = HTTPBearer()
 
+# 카카오 API 호출용 비동기 HTTP 클라이언트 (keep-alive/HTTP2 연결 재사용)
+kakao_client = httpx.AsyncClient(timeout=10, http2=True)
+
 # 데이터베이스 초기화
 def init_database():
     """데이터베이스 초기화"""
-    conn = sqlite3.connect('compressor_system.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
+    # WAL 모드는 DB 파일에 기록되므로 한 번만 설정하면 됨
+    cursor.execute("PRAGMA journal_mode=WAL")
+    
     # 사용자 테이블 (카카오톡 로그인 지원)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id TEXT PRIMARY KEY,
             email TEXT UNIQUE NOT NULL,
             password_hash TEXT,
+            password_salt TEXT,
             company_name TEXT,
             contact_person TEXT,
             phone TEXT,
@@ -74,6 +123,11 @@ def init_database():
         )
     ''')
     
+    # 기존 DB 마이그레이션: 비밀번호 salt 컬럼 추가
+    user_columns = [row[1] for row in cursor.execute("PRAGMA table_info(users)")]
+    if 'password_salt' not in user_columns:
+        cursor.execute("ALTER TABLE users ADD COLUMN password_salt TEXT")
+    
     # 고객 테이블 (기존)
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS customers (
@@ -118,6 +172,11 @@ def init_database():
         )
     ''')
     
+    # 조회 패턴용 인덱스
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_dh_user_created ON diagnosis_history(user_id, created_at DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_customer ON audio_files(customer_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_audio_upload ON audio_files(upload_time DESC)")
+    
     conn.commit()
     conn.close()
     logger.info("데이터베이스 초기화 완료")
@@ -149,13 +208,22 @@ class DiagnosisResult(BaseModel):
     processing_time: float
 
 # 유틸리티 함수들
-def hash_password(password: str) -> str:
-    """비밀번호 해시화"""
-    return hashlib.sha256(password.encode()).hexdigest()
+def hash_password(password: str, salt: Optional[bytes] = None) -> Tuple[str, str]:
+    """비밀번호 해시화 (scrypt + 사용자별 salt) - (해시, salt)를 hex 문자열로 반환"""
+    if salt is None:
+        salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+    return digest.hex(), salt.hex()
 
-def verify_password(password: str, hashed: str) -> bool:
-    """비밀번호 검증"""
-    return hash_password(password) == hashed
+def verify_password(password: str, hashed: str, salt: Optional[str] = None) -> bool:
+    """비밀번호 검증 (salt가 없는 기존 계정은 SHA-256 해시로 비교)"""
+    if not hashed:
+        return False
+    if salt is None:
+        candidate = hashlib.sha256(password.encode()).hexdigest()
+    else:
+        candidate, _ = hash_password(password, bytes.fromhex(salt))
+    return hmac.compare_digest(candidate, hashed)
 
 def create_access_token(data: dict):
     """JWT 토큰 생성"""
@@ -165,30 +233,121 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """토큰 검증"""
+def decode_token(token: str) -> dict:
+    """JWT 디코딩 + 검증 - sub 클레임이 있는 payload 반환"""
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
 
-def get_db_connection():
-    """데이터베이스 연결"""
-    conn = sqlite3.connect('compressor_system.db')
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """토큰 검증"""
+    return decode_token(credentials.credentials)["sub"]
+
+def require_admin(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """관리자 토큰 검증 (role 클레임 사용, DB 조회 없음, 토큰은 한 번만 디코딩)"""
+    payload = decode_token(credentials.credentials)
+    if payload.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
+    return payload["sub"]
+
+db_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=DB_POOL_SIZE)
+
+def open_db_connection() -> sqlite3.Connection:
+    """풀에 넣을 SQLite 연결 생성 (연결별 PRAGMA 적용)"""
+    conn = sqlite3.connect(DB_PATH, timeout=5.0, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
+def init_db_pool():
+    """연결 풀 미리 채우기"""
+    while not db_pool.full():
+        db_pool.put_nowait(open_db_connection())
+
+def get_db_connection():
+    """데이터베이스 연결 (풀에서 대여, 풀이 비면 새로 생성)"""
+    try:
+        return db_pool.get_nowait()
+    except queue.Empty:
+        return open_db_connection()
+
+def release_db_connection(conn: sqlite3.Connection):
+    """연결 반납 (미완료 트랜잭션은 롤백, 풀이 가득 차면 닫기)"""
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        db_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+# 특징 통계 (행별 평균/표준편차를 출력 배열 하나에 기록)
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _mean_std(x):
+        n = x.size
+        total = 0.0
+        for v in x:
+            total += v
+        mean = total / n
+        sq = 0.0
+        for v in x:
+            d = v - mean
+            sq += d * d
+        return mean, np.sqrt(sq / n)
+
+    @numba.njit(cache=True)
+    def _feature_stats(mfcc, centroid, rolloff, zcr, out):
+        n_mfcc = mfcc.shape[0]
+        for i in range(n_mfcc):
+            m, sd = _mean_std(mfcc[i])
+            out[i] = m
+            out[n_mfcc + i] = sd
+        base = 2 * n_mfcc
+        m, sd = _mean_std(centroid)
+        out[base], out[base + 1] = m, sd
+        m, sd = _mean_std(rolloff)
+        out[base + 2], out[base + 3] = m, sd
+        m, sd = _mean_std(zcr)
+        out[base + 4], out[base + 5] = m, sd
+        return out
+
+    # import 시점에 한 번 컴파일해 첫 요청에서 JIT 비용이 발생하지 않도록 함
+    _dummy = np.zeros(2, dtype=np.float32)
+    _feature_stats(np.zeros((13, 2), dtype=np.float32), _dummy, _dummy, _dummy, np.empty(32, dtype=np.float32))
+else:
+    def _feature_stats(mfcc, centroid, rolloff, zcr, out):
+        n_mfcc = mfcc.shape[0]
+        out[:n_mfcc] = np.mean(mfcc, axis=1)
+        out[n_mfcc:2 * n_mfcc] = np.std(mfcc, axis=1)
+        base = 2 * n_mfcc
+        for offset, values in ((0, centroid), (2, rolloff), (4, zcr)):
+            out[base + offset] = np.mean(values)
+            out[base + offset + 1] = np.std(values)
+        return out
+
 # AI 모델 클래스
 class CompressorAIModel:
+    MODEL_PATH = "models/lightweight_compressor_ai.pkl"
+    COMPILED_MODEL_PATH = "models/lightweight_compressor_ai.dll" if os.name == 'nt' else "models/lightweight_compressor_ai.so"
+    ONNX_MODEL_PATH = "models/lightweight_compressor_ai.onnx"
+    
     def __init__(self):
         self.model = None
         self.scaler = None
+        self.predictor = None
+        self.onnx_session = None
+        # 고정 shape(sr=22050, n_fft=2048, n_mels=128, n_mfcc=13)용 mel 필터뱅크/DCT 기저 미리 계산
+        self.mel_fb = librosa.filters.mel(sr=22050, n_fft=2048, n_mels=128)
+        self.dct_basis = scipy.fft.dct(np.eye(128, dtype=np.float32), type=2, norm='ortho', axis=0)[:13]
+        self.stft_window = get_window('hann', 2048).astype(np.float32)  # librosa.stft 기본 창 (periodic Hann)
         self.labels = {
             'compressor_normal': '정상 압축기',
             'compressor_overload': '압축기 과부하',
@@ -200,42 +359,96 @@ class CompressorAIModel:
     def load_model(self):
         """모델 로드"""
         try:
-            model_path = "models/lightweight_compressor_ai.pkl"
+            model_path = self.MODEL_PATH
             if os.path.exists(model_path):
                 with open(model_path, 'rb') as f:
                     model_data = pickle.load(f)
                     self.model = model_data.get('model')
                     self.scaler = model_data.get('scaler')
                     print("✅ AI 모델 로드 완료")
+                self.compile_model()
+                if self.predictor is None:
+                    self.export_onnx_model()
             else:
                 print("⚠️ 모델 파일이 없습니다. 기본값을 사용합니다.")
         except Exception as e:
             print(f"⚠️ 모델 로드 실패: {e}. 기본값을 사용합니다.")
     
+    def compile_model(self):
+        """RandomForest를 네이티브 라이브러리로 컴파일 (treelite 설치 시)"""
+        if not TREE_COMPILER_AVAILABLE or not isinstance(self.model, RandomForestClassifier):
+            return
+        
+        try:
+            lib_path = self.COMPILED_MODEL_PATH
+            # 모델 파일보다 오래된 라이브러리만 다시 컴파일
+            if not os.path.exists(lib_path) or os.path.getmtime(lib_path) < os.path.getmtime(self.MODEL_PATH):
+                tl_model = treelite.sklearn.import_model(self.model)
+                tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=lib_path, params={"parallel_comp": 0})
+            self.predictor = tl2cgen.Predictor(lib_path)
+            print("✅ AI 모델 네이티브 컴파일 완료")
+        except Exception as e:
+            self.predictor = None
+            print(f"⚠️ 모델 컴파일 실패: {e}. scikit-learn 추론을 사용합니다.")
+    
+    def export_onnx_model(self):
+        """RandomForest를 ONNX로 변환해 ONNX Runtime 세션 생성 (onnxruntime 설치 시)"""
+        if not ONNX_AVAILABLE or not isinstance(self.model, RandomForestClassifier):
+            return
+        
+        try:
+            onnx_path = self.ONNX_MODEL_PATH
+            if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(self.MODEL_PATH):
+                onnx_model = convert_sklearn(
+                    self.model,
+                    initial_types=[('input', FloatTensorType([None, self.model.n_features_in_]))],
+                    options={id(self.model): {'zipmap': False}}
+                )
+                with open(onnx_path, 'wb') as f:
+                    f.write(onnx_model.SerializeToString())
+            
+            sess_options = ort.SessionOptions()
+            sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.onnx_session = ort.InferenceSession(onnx_path, sess_options, providers=['CPUExecutionProvider'])
+            print("✅ AI 모델 ONNX Runtime 로드 완료")
+        except Exception as e:
+            self.onnx_session = None
+            print(f"⚠️ ONNX 변환 실패: {e}. scikit-learn 추론을 사용합니다.")
+    
+    def stft_magnitude(self, audio, n_fft=2048, hop_length=512):
+        """진폭 스펙트로그램 (librosa.stft 기본값과 동일한 프레이밍, scipy.fft 멀티스레드 rfft)"""
+        padded = np.pad(audio, n_fft // 2)  # center=True, 0 패딩
+        frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[::hop_length]
+        return np.abs(scipy.fft.rfft(frames * self.stft_window, axis=1, workers=-1)).T
+    
     def extract_features(self, audio, sr=22050):
         """오디오 특징 추출"""
         try:
-            # MFCC 특징
-            mfcc = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-            mfcc_mean = np.mean(mfcc, axis=1)
-            mfcc_std = np.std(mfcc, axis=1)
+            # STFT는 한 번만 계산해서 모든 스펙트럴 특징에 공유
+            magnitude = self.stft_magnitude(audio)
+            power = magnitude ** 2
             
-            # 스펙트럴 특징
-            spectral_centroid = librosa.feature.spectral_centroid(y=audio, sr=sr)
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)
+            # MFCC 특징 (librosa mfcc와 동일: mel 필터뱅크 -> dB -> DCT-II ortho)
+            mel_fb = self.mel_fb if sr == 22050 else librosa.filters.mel(sr=sr, n_fft=2048, n_mels=128)
+            mel = mel_fb @ power
+            mfcc = self.dct_basis @ librosa.power_to_db(mel)
+            
+            # 스펙트럴 특징 (y= 경로와 동일하게 진폭 스펙트로그램 사용)
+            spectral_centroid = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+            spectral_rolloff = librosa.feature.spectral_rolloff(S=magnitude, sr=sr)
             
             # 진동 특징
             zero_crossing_rate = librosa.feature.zero_crossing_rate(audio)
             
-            # 특징 결합
-            features = np.concatenate([
-                mfcc_mean, mfcc_std,
-                np.mean(spectral_centroid), np.std(spectral_centroid),
-                np.mean(spectral_rolloff), np.std(spectral_rolloff),
-                np.mean(zero_crossing_rate), np.std(zero_crossing_rate)
-            ])
-            
-            return features
+            # 특징 결합 (MFCC 평균/표준편차 + 스펙트럴/ZCR 평균/표준편차)
+            features = np.empty(2 * mfcc.shape[0] + 6, dtype=np.float32)
+            return _feature_stats(
+                np.ascontiguousarray(mfcc, dtype=np.float32),
+                spectral_centroid.ravel().astype(np.float32, copy=False),
+                spectral_rolloff.ravel().astype(np.float32, copy=False),
+                zero_crossing_rate.ravel().astype(np.float32, copy=False),
+                features
+            )
         except Exception as e:
             print(f"특징 추출 실패: {e}")
             return None
@@ -251,12 +464,15 @@ class CompressorAIModel:
                 return "정상 압축기", 0.8
             
             # 특징 정규화
+            X = features.reshape(1, -1)
             if self.scaler:
-                features = self.scaler.transform(features.reshape(1, -1))
+                X = self.scaler.transform(X)
             
-            # 예측
-            prediction = self.model.predict(features.reshape(1, -1))[0]
-            confidence = np.max(self.model.predict_proba(features.reshape(1, -1)))
+            # 예측: 확률을 한 번만 계산하고 argmax (predict + predict_proba 이중 트리 순회 방지)
+            proba = self._predict_proba(X)[0]
+            idx = int(np.argmax(proba))
+            prediction = self.model.classes_[idx]
+            confidence = float(proba[idx])
             
             # 라벨 변환
             diagnosis = self.labels.get(prediction, "정상 압축기")
@@ -265,16 +481,112 @@ class CompressorAIModel:
         except Exception as e:
             print(f"예측 실패: {e}")
             return "정상 압축기", 0.8
+    
+    def _predict_proba(self, X):
+        """백엔드별 클래스 확률 계산 - (N, 클래스 수) 배열 반환"""
+        if self.predictor is not None:
+            proba = np.asarray(self.predictor.predict(tl2cgen.DMatrix(X))).reshape(len(X), -1)
+            if proba.shape[1] == 1:  # 이진 분류는 양성 확률만 반환
+                proba = np.hstack([1.0 - proba, proba])
+            return proba
+        if self.onnx_session is not None:
+            _, proba = self.onnx_session.run(None, {'input': X.astype(np.float32, copy=False)})
+            return np.asarray(proba)
+        return self.model.predict_proba(X)
+    
+    def predict_batch(self, features_list):
+        """여러 파일의 특징을 한 번에 진단 예측 - [(진단, 신뢰도), ...] 반환"""
+        results = [("정상 압축기", 0.8)] * len(features_list)  # 기본값
+        valid = [i for i, features in enumerate(features_list) if features is not None]
+        if self.model is None or not valid:
+            return results
+        
+        try:
+            X = np.vstack([features_list[i] for i in valid])
+            if self.scaler:
+                X = self.scaler.transform(X)
+            
+            proba = self._predict_proba(X)
+            best = proba.argmax(axis=1)
+            for row, i in enumerate(valid):
+                prediction = self.model.classes_[best[row]]
+                results[i] = (self.labels.get(prediction, "정상 압축기"), float(proba[row, best[row]]))
+        except Exception as e:
+            print(f"배치 예측 실패: {e}")
+        
+        return results
 
 # AI 모델 인스턴스
 ai_model = CompressorAIModel()
 
+# 디코딩/추론/DB 작업용 스레드 풀 (이벤트 루프 블로킹 방지)
+THREAD_POOL = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# 진단 결과 캐시: 업로드 파일 내용의 SHA-256 → (길이(초), 진단, 신뢰도)
+SAMPLE_RATE = 22050
+DIAGNOSIS_CACHE_SIZE = 512
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+diagnosis_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+def load_audio(file_path: str, sr: int = SAMPLE_RATE):
+    """오디오 로드 - WAV 등은 soundfile로 직접 디코딩, 실패 시 librosa 사용"""
+    try:
+        data, native_sr = sf.read(file_path, dtype='float32', always_2d=False)
+    except Exception:
+        audio, sr = librosa.load(file_path, sr=sr)
+        return audio.astype(np.float32, copy=False), sr
+    
+    audio = data if data.ndim == 1 else data.mean(axis=1)
+    if native_sr != sr:
+        audio = resample_poly(audio, sr, native_sr).astype(np.float32, copy=False)
+    return audio, sr
+
+def analyze_audio_file(file_path: str):
+    """오디오 디코딩 + AI 진단 (스레드 풀에서 실행) - (길이(초), 진단, 신뢰도, 처리시간) 반환"""
+    audio, sr = load_audio(file_path)
+    start_time = datetime.now()
+    diagnosis, confidence = ai_model.predict(audio, sr)
+    processing_time = (datetime.now() - start_time).total_seconds()
+    return len(audio) / sr, diagnosis, confidence, processing_time
+
+def extract_audio_features(file_path: str):
+    """오디오 디코딩 + 특징 추출 (스레드 풀에서 실행) - (길이(초), 특징, 처리시간) 반환"""
+    audio, sr = load_audio(file_path)
+    start_time = datetime.now()
+    features = ai_model.extract_features(audio, sr)
+    processing_time = (datetime.now() - start_time).total_seconds()
+    return len(audio) / sr, features, processing_time
+
+async def save_upload(file: UploadFile, file_path: str) -> bytes:
+    """업로드 파일을 청크 단위로 디스크에 저장 - 내용의 SHA-256 digest 반환"""
+    content_hash = hashlib.sha256()
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            content_hash.update(chunk)
+            await buffer.write(chunk)
+    return content_hash.digest()
+
+def get_cached_diagnosis(content_hash: bytes):
+    """캐시된 진단 결과 조회 (LRU)"""
+    cached = diagnosis_cache.get(content_hash)
+    if cached is not None:
+        diagnosis_cache.move_to_end(content_hash)
+    return cached
+
+def cache_diagnosis(content_hash: bytes, result: tuple):
+    """진단 결과 캐시 저장 (최대 DIAGNOSIS_CACHE_SIZE개)"""
+    diagnosis_cache[content_hash] = result
+    diagnosis_cache.move_to_end(content_hash)
+    if len(diagnosis_cache) > DIAGNOSIS_CACHE_SIZE:
+        diagnosis_cache.popitem(last=False)
+
 # API 엔드포인트들
 @app.on_event("startup")
 async def startup_event():
     """앱 시작 시 실행"""
     try:
         init_database()
+        init_db_pool()
         print("✅ 데이터베이스 초기화 완료")
         print("✅ 백엔드 API 서버가 시작되었습니다.")
         print("🌐 API 문서: http://localhost:8000/docs")
@@ -283,6 +595,11 @@ async def startup_event():
         print(f"⚠️ 서버 시작 중 오류: {e}")
         print("서버는 계속 실행되지만 일부 기능이 제한될 수 있습니다.")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """앱 종료 시 실행"""
+    await kakao_client.aclose()
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -302,12 +619,13 @@ async def register_user(user: UserCreate):
         
         # 사용자 생성
         user_id = f"user_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        password_hash = hash_password(user.password)
+        # scrypt는 의도적으로 느리므로 이벤트 루프 밖에서 계산
+        password_hash, password_salt = await asyncio.to_thread(hash_password, user.password)
         
         cursor.execute("""
-            INSERT INTO users (id, email, password_hash, company_name, contact_person, phone)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, user.email, password_hash, user.company_name, user.contact_person, user.phone))
+            INSERT INTO users (id, email, password_hash, password_salt, company_name, contact_person, phone)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, user.email, password_hash, password_salt, user.company_name, user.contact_person, user.phone))
         
         # 고객 테이블에도 추가
         cursor.execute("""
@@ -323,7 +641,7 @@ async def register_user(user: UserCreate):
         conn.rollback()
         raise HTTPException(status_code=500, detail=f"회원가입 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.post("/auth/login")
 async def login_user(user: UserLogin):
@@ -336,11 +654,22 @@ async def login_user(user: UserLogin):
         cursor.execute("SELECT * FROM users WHERE email = ?", (user.email,))
         user_data = cursor.fetchone()
         
-        if not user_data or not verify_password(user.password, user_data['password_hash']):
+        if not user_data or not await asyncio.to_thread(
+            verify_password, user.password, user_data['password_hash'], user_data['password_salt']
+        ):
             raise HTTPException(status_code=401, detail="이메일 또는 비밀번호가 잘못되었습니다.")
         
+        # 기존 SHA-256 계정은 로그인 성공 시 scrypt로 재해시
+        if user_data['password_salt'] is None:
+            password_hash, password_salt = await asyncio.to_thread(hash_password, user.password)
+            cursor.execute(
+                "UPDATE users SET password_hash = ?, password_salt = ? WHERE id = ?",
+                (password_hash, password_salt, user_data['id'])
+            )
+            conn.commit()
+        
         # 토큰 생성
-        access_token = create_access_token(data={"sub": user_data['id']})
+        access_token = create_access_token(data={"sub": user_data['id'], "role": user_data['role']})
         
         return {
             "access_token": access_token,
@@ -357,7 +686,7 @@ async def login_user(user: UserLogin):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"로그인 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.get("/users/me")
 async def get_current_user(user_id: str = Depends(verify_token)):
@@ -377,7 +706,7 @@ async def get_current_user(user_id: str = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"사용자 정보 조회 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 # 카카오톡 로그인 관련 엔드포인트들
 @app.get("/auth/kakao/login")
@@ -400,14 +729,14 @@ async def kakao_callback(code: str):
             "code": code
         }
         
-        token_response = requests.post(token_url, data=token_data)
+        token_response = await kakao_client.post(token_url, data=token_data)
         token_response.raise_for_status()
         token_info = token_response.json()
         
         # 사용자 정보 요청
         user_info_url = "https://kapi.kakao.com/v2/user/me"
         headers = {"Authorization": f"Bearer {token_info['access_token']}"}
-        user_response = requests.get(user_info_url, headers=headers)
+        user_response = await kakao_client.get(user_info_url, headers=headers)
         user_response.raise_for_status()
         user_info = user_response.json()
         
@@ -422,7 +751,7 @@ async def kakao_callback(code: str):
             
             if existing_user:
                 # 기존 사용자 로그인
-                access_token = create_access_token(data={"sub": existing_user['id']})
+                access_token = create_access_token(data={"sub": existing_user['id'], "role": existing_user['role']})
                 return {
                     "access_token": access_token,
                     "token_type": "bearer",
@@ -454,7 +783,7 @@ async def kakao_callback(code: str):
                 
                 conn.commit()
                 
-                access_token = create_access_token(data={"sub": user_id})
+                access_token = create_access_token(data={"sub": user_id, "role": "customer"})
                 return {
                     "access_token": access_token,
                     "token_type": "bearer",
@@ -472,9 +801,9 @@ async def kakao_callback(code: str):
             conn.rollback()
             raise HTTPException(status_code=500, detail=f"카카오톡 로그인 처리 실패: {str(e)}")
         finally:
-            conn.close()
+            release_db_connection(conn)
     
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=400, detail=f"카카오톡 API 요청 실패: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"카카오톡 로그인 실패: {str(e)}")
@@ -488,76 +817,122 @@ async def upload_and_diagnose(
     user_id: str = Depends(verify_token)
 ):
     """파일 업로드 및 진단"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    results = []
+    loop = asyncio.get_running_loop()
+    rows = []
+    pending = []  # 캐시 미스 파일: (rows 인덱스, content_hash)
     
     try:
+        upload_dir = "uploads"
+        os.makedirs(upload_dir, exist_ok=True)
+        
         for file in files:
             # 파일 저장
-            upload_dir = "uploads"
-            os.makedirs(upload_dir, exist_ok=True)
-            
             file_path = os.path.join(upload_dir, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}")
             
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
+            content_hash = await save_upload(file, file_path)
             
-            # 오디오 분석
-            audio, sr = librosa.load(file_path, sr=22050)
-            duration = len(audio) / sr
-            
-            # AI 진단
+            # 같은 내용의 파일은 디코딩/특징 추출/모델 추론 생략
+            cached = get_cached_diagnosis(content_hash)
+            if cached is not None:
+                duration, diagnosis, confidence = cached
+                rows.append([file.filename, file_path, duration, diagnosis, confidence, 0.0])
+            else:
+                pending.append((len(rows), content_hash))
+                rows.append([file.filename, file_path, None, None, None, None])
+        
+        if pending:
+            # 디코딩/특징 추출은 파일별 병렬, 모델 추론은 한 번의 배치 호출
+            extracted = await asyncio.gather(*(
+                loop.run_in_executor(THREAD_POOL, extract_audio_features, rows[i][1])
+                for i, _ in pending
+            ))
             start_time = datetime.now()
-            diagnosis, confidence = ai_model.predict(audio, sr)
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            # 데이터베이스 저장
-            cursor.execute("""
-                INSERT INTO audio_files (filename, duration, sample_rate, file_path, customer_id, equipment_id, diagnosis_result, confidence)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (file.filename, duration, sr, file_path, user_id, equipment_id, diagnosis, confidence))
-            
-            file_id = cursor.lastrowid
-            
-            # 진단 이력 저장
-            cursor.execute("""
-                INSERT INTO diagnosis_history (user_id, file_id, diagnosis_result, confidence, processing_time)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, file_id, diagnosis, confidence, processing_time))
+            predictions = await loop.run_in_executor(
+                THREAD_POOL, ai_model.predict_batch, [features for _, features, _ in extracted]
+            )
+            batch_time = (datetime.now() - start_time).total_seconds() / len(pending)
             
-            # 결과 생성
-            result = DiagnosisResult(
+            for (i, content_hash), (duration, _, feature_time), (diagnosis, confidence) in zip(pending, extracted, predictions):
+                rows[i][2:] = [duration, diagnosis, confidence, feature_time + batch_time]
+                cache_diagnosis(content_hash, (duration, diagnosis, confidence))
+        
+        # 데이터베이스 저장
+        file_ids = await loop.run_in_executor(
+            THREAD_POOL, save_diagnosis_results, user_id, equipment_id, rows
+        )
+        
+        # 결과 생성
+        results = [
+            DiagnosisResult(
                 file_id=str(file_id),
-                filename=file.filename,
+                filename=filename,
                 equipment_id=equipment_id,
                 diagnosis=diagnosis,
                 confidence=confidence,
                 recommendations=get_recommendations(diagnosis),
                 processing_time=processing_time
             )
-            results.append(result)
+            for file_id, (filename, _, _, diagnosis, confidence, processing_time) in zip(file_ids, rows)
+        ]
         
-        conn.commit()
         return {"results": results, "message": f"{len(results)}개 파일 진단 완료"}
     
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=f"진단 실패: {str(e)}")
+
+def save_diagnosis_results(user_id: str, equipment_id: str, rows: list) -> List[int]:
+    """진단 결과 DB 저장 (스레드 풀에서 실행) - 생성된 file_id 목록 반환"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # 쓰기 잠금을 먼저 잡고 file_id를 직접 할당 (executemany는 lastrowid를 돌려주지 않음)
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("""
+            SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'audio_files'), 0),
+                       IFNULL((SELECT MAX(id) FROM audio_files), 0))
+        """)
+        first_id = cursor.fetchone()[0] + 1
+        file_ids = list(range(first_id, first_id + len(rows)))
+        
+        cursor.executemany("""
+            INSERT INTO audio_files (id, filename, duration, sample_rate, file_path, customer_id, equipment_id, diagnosis_result, confidence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (file_id, filename, duration, SAMPLE_RATE, file_path, user_id, equipment_id, diagnosis, confidence)
+            for file_id, (filename, file_path, duration, diagnosis, confidence, _) in zip(file_ids, rows)
+        ])
+        
+        # 진단 이력 저장
+        cursor.executemany("""
+            INSERT INTO diagnosis_history (user_id, file_id, diagnosis_result, confidence, processing_time)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (user_id, file_id, diagnosis, confidence, processing_time)
+            for file_id, (_, _, _, diagnosis, confidence, processing_time) in zip(file_ids, rows)
+        ])
+        
+        conn.commit()
+        return file_ids
+    
+    except Exception:
+        conn.rollback()
+        raise
     finally:
-        conn.close()
+        release_db_connection(conn)
+
+# 진단 결과별 권장사항 (읽기 전용)
+RECOMMENDATIONS = {
+    "정상 압축기": ["정기 점검 유지", "모니터링 지속"],
+    "압축기 과부하": ["부하 감소 필요", "냉각 시스템 점검", "운전 조건 조정"],
+    "압축기 베어링 마모": ["베어링 교체 필요", "윤활유 점검", "진동 모니터링 강화"],
+    "압축기 밸브 이상": ["밸브 점검 필요", "압력 조정", "유지보수 일정 조정"]
+}
+_DEFAULT_RECOMMENDATIONS = ["전문가 상담 권장"]
 
 def get_recommendations(diagnosis: str) -> List[str]:
     """진단 결과에 따른 권장사항"""
-    recommendations = {
-        "정상 압축기": ["정기 점검 유지", "모니터링 지속"],
-        "압축기 과부하": ["부하 감소 필요", "냉각 시스템 점검", "운전 조건 조정"],
-        "압축기 베어링 마모": ["베어링 교체 필요", "윤활유 점검", "진동 모니터링 강화"],
-        "압축기 밸브 이상": ["밸브 점검 필요", "압력 조정", "유지보수 일정 조정"]
-    }
-    return recommendations.get(diagnosis, ["전문가 상담 권장"])
+    return RECOMMENDATIONS.get(diagnosis, _DEFAULT_RECOMMENDATIONS)
 
 @app.get("/diagnosis/history")
 async def get_diagnosis_history(user_id: str = Depends(verify_token)):
@@ -567,46 +942,30 @@ async def get_diagnosis_history(user_id: str = Depends(verify_token)):
     
     try:
         cursor.execute("""
-            SELECT dh.*, af.filename, af.equipment_id
+            SELECT dh.id, af.filename, af.equipment_id, dh.diagnosis_result,
+                   dh.confidence, dh.processing_time, dh.created_at
             FROM diagnosis_history dh
             JOIN audio_files af ON dh.file_id = af.id
             WHERE dh.user_id = ?
             ORDER BY dh.created_at DESC
         """, (user_id,))
         
-        history = []
-        for row in cursor.fetchall():
-            history.append({
-                "id": row['id'],
-                "filename": row['filename'],
-                "equipment_id": row['equipment_id'],
-                "diagnosis_result": row['diagnosis_result'],
-                "confidence": row['confidence'],
-                "processing_time": row['processing_time'],
-                "created_at": row['created_at']
-            })
+        history = [dict(row) for row in cursor.fetchall()]
         
         return {"history": history}
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"이력 조회 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 @app.get("/customers")
-async def get_customers(user_id: str = Depends(verify_token)):
+async def get_customers(user_id: str = Depends(require_admin)):
     """고객 목록 조회 (관리자용)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # 관리자 권한 확인
-        cursor.execute("SELECT role FROM users WHERE id = ?", (user_id,))
-        user_data = cursor.fetchone()
-        
-        if not user_data or user_data['role'] != 'admin':
-            raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
-        
         cursor.execute("SELECT * FROM customers ORDER BY created_at DESC")
         customers = []
         for row in cursor.fetchall():
@@ -617,7 +976,7 @@ async def get_customers(user_id: str = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"고객 목록 조회 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 # 현장 진단 관련 엔드포인트
 @app.post("/field-diagnosis/analyze")
@@ -638,15 +997,12 @@ async def field_diagnosis_analyze(
         filename = f"{customer_name}_{equipment_id}_{timestamp}.wav"
         file_path = os.path.join(upload_dir, filename)
         
-        with open(file_path, "wb") as buffer:
-            content = await audio_file.read()
-            buffer.write(content)
+        await save_upload(audio_file, file_path)
         
-        # AI 분석
-        audio, sr = librosa.load(file_path, sr=22050)
-        start_time = datetime.now()
-        diagnosis, confidence = ai_model.predict(audio, sr)
-        processing_time = (datetime.now() - start_time).total_seconds()
+        # AI 분석 (스레드 풀)
+        _, diagnosis, confidence, processing_time = await asyncio.get_running_loop().run_in_executor(
+            THREAD_POOL, analyze_audio_file, file_path
+        )
         
         # 결과 저장 (현장 진단 DB)
         conn = sqlite3.connect('field_diagnosis.db')
@@ -810,31 +1166,23 @@ async def get_field_diagnosis_history(
         raise HTTPException(status_code=500, detail=f"이력 조회 실패: {str(e)}")
 
 @app.get("/stats/system")
-async def get_system_stats(user_id: str = Depends(verify_token)):
+async def get_system_stats(user_id: str = Depends(require_admin)):
     """시스템 통계 조회 (관리자용)"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
     try:
-        # 관리자 권한 확인
-        cursor.execute("SELECT role FROM users WHERE id = ?", (user_id,))
-        user_data = cursor.fetchone()
-        
-        if not user_data or user_data['role'] != 'admin':
-            raise HTTPException(status_code=403, detail="관리자 권한이 필요합니다.")
-        
-        # 통계 조회
-        cursor.execute("SELECT COUNT(*) FROM customers")
-        total_customers = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM audio_files")
-        total_files = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM audio_files WHERE DATE(upload_time) = DATE('now')")
-        today_diagnoses = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT AVG(confidence) FROM diagnosis_history")
-        avg_confidence = cursor.fetchone()[0] or 0.0
+        # 통계 조회 (단일 쿼리, 오늘 범위는 upload_time 인덱스 범위 검색)
+        cursor.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM customers),
+                (SELECT COUNT(*) FROM audio_files),
+                (SELECT COUNT(*) FROM audio_files
+                 WHERE upload_time >= DATE('now') AND upload_time < DATE('now', '+1 day')),
+                (SELECT AVG(confidence) FROM diagnosis_history)
+        """)
+        total_customers, total_files, today_diagnoses, avg_confidence = cursor.fetchone()
+        avg_confidence = avg_confidence or 0.0
         
         return {
             "total_customers": total_customers,
@@ -846,7 +1194,7 @@ async def get_system_stats(user_id: str = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"통계 조회 실패: {str(e)}")
     finally:
-        conn.close()
+        release_db_connection(conn)
 
 if __name__ == "__main__":
     import uvicorn
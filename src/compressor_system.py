@@ -1,11 +1,9 @@
 # compressor_system.py - 경량 AI가 통합된 압축기 진단 시스템
 import streamlit as st
-import librosa
+import soundfile as sf
+import soxr
 import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-import plotly.express as px
-from plotly.subplots import make_subplots
 import sqlite3
 import json
 import io
@@ -14,11 +12,14 @@ import time
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from scipy import signal
-import pickle
+import scipy.fft
+import joblib
 import os
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import warnings
 
 # 🎨 Streamlit 페이지 설정 (최상단에 한 번만!)
@@ -28,8 +29,179 @@ st.set_page_config(
     layout="wide"
 )
 
+# 선택적 의존성: 트리 앙상블 네이티브 컴파일 (treelite + tl2cgen)
+try:
+    import treelite
+    import tl2cgen
+    TREE_COMPILER_AVAILABLE = True
+except ImportError:
+    TREE_COMPILER_AVAILABLE = False
+
+# 선택적 의존성: 특징 계산 JIT 컴파일 (numba)
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# librosa(numba/audioread 포함)와 plotly는 무거우므로 처음 쓰는 함수 안에서 import (콜드 스타트 단축)
+
 warnings.filterwarnings('ignore')
 
+def positive_spectrum(audio, sr):
+    """실수 신호의 양의 주파수 스펙트럼 (rfft, fft 결과의 freqs > 0 구간과 동일)"""
+    n = len(audio)
+    stop = (n + 1) // 2  # DC와 (짝수 길이일 때) 나이퀴스트 빈 제외
+    spectrum = scipy.fft.rfft(audio, workers=-1)[1:stop]
+    freqs = scipy.fft.rfftfreq(n, 1 / sr)[1:stop]
+    return freqs, spectrum
+
+def scaler_to_float32(scaler):
+    """학습된 StandardScaler 통계를 float32로 변환 (float32 입력이 float64로 승격되지 않도록)"""
+    if isinstance(scaler, StandardScaler):
+        for attr in ('mean_', 'var_', 'scale_'):
+            value = getattr(scaler, attr, None)
+            if value is not None:
+                setattr(scaler, attr, np.asarray(value, dtype=np.float32))
+    return scaler
+
+def scaler_params(scaler):
+    """학습된 StandardScaler의 (mean, 1/scale) - 단일 행 변환 시 scikit-learn 입력 검증 생략용
+
+    StandardScaler가 아니거나 아직 학습 전이면 None (scaler.transform 사용)
+    """
+    if not isinstance(scaler, StandardScaler) or not hasattr(scaler, 'scale_'):
+        return None
+    mean = np.asarray(scaler.mean_, dtype=np.float32) if scaler.with_mean else np.float32(0.0)
+    inv_scale = (1.0 / np.asarray(scaler.scale_, dtype=np.float32)) if scaler.with_std else np.float32(1.0)
+    return mean, inv_scale
+
+def fast_load(path, sr=None):
+    """오디오 로드 - WAV/FLAC은 soundfile + soxr로 직접 처리, 실패 시(MP3 등) librosa 사용
+
+    librosa.load(path, sr=sr, mono=True)와 같은 (audio, sr)를 반환 (sr=None이면 원본 샘플레이트)
+    """
+    try:
+        audio, native_sr = sf.read(path, dtype='float32', always_2d=False)
+    except Exception:
+        import librosa
+        return librosa.load(path, sr=sr, mono=True)
+    
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    if sr is None or sr == native_sr:
+        return audio, native_sr
+    return soxr.resample(audio, native_sr, sr, quality='HQ'), sr
+
+DB_PATH = 'compressor_system.db'
+
+# 파일별 INSERT (SQL 문자열이 같아야 sqlite3 연결의 prepared statement 캐시를 재사용)
+INSERT_AUDIO_FILE_SQL = '''
+    INSERT INTO audio_files 
+    (filename, duration, sample_rate, file_path, customer_id, equipment_id, features)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+# process_files 파일별 처리 결과 (prediction은 AI 예측 시에만 설정)
+FileResult = namedtuple('FileResult', ['filename', 'status', 'duration', 'file_id', 'prediction'], defaults=[None])
+
+# 파일 목록 한 페이지에 표시할 최대 행 수
+FILES_PAGE_SIZE = 500
+
+# 대시보드 지표/차트 자동 갱신 주기 (초, st.fragment 단위로만 재실행)
+DASHBOARD_REFRESH_SECONDS = 30
+
+# 같은 오디오 재업로드 시 재사용할 예측 결과 수 (LRU)
+PREDICTION_CACHE_SIZE = 256
+
+# 경량 RandomForest 재학습 시 남길 특징의 최소 중요도
+FEATURE_IMPORTANCE_THRESHOLD = 0.01
+
+# 경량 특징 계산 (통계 + 대역 에너지 비율 + RMS/크레스트 팩터, 12차원 float32)
+# nogil: 학습/업로드 스레드 풀에서 커널이 실제로 병렬 실행되도록 GIL 해제
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True, nogil=True)
+    def rms_peak(audio):
+        """RMS와 절대값 최대치를 한 번의 순회로 계산"""
+        sq = 0.0
+        peak = 0.0
+        for v in audio:
+            sq += v * v
+            peak = max(peak, abs(v))
+        return np.sqrt(sq / audio.size), peak
+
+    @numba.njit(cache=True, nogil=True)
+    def _lightweight_features(audio, magnitude, starts, stops):
+        out = np.empty(12, dtype=np.float32)
+        n = audio.size
+        
+        # 합/제곱합/최대/최소를 한 번의 순회로 (분산은 평균이 필요해 두 번째 순회)
+        total = 0.0
+        sq = 0.0
+        mx = audio[0]
+        mn = audio[0]
+        for v in audio:
+            total += v
+            sq += v * v
+            mx = max(mx, v)
+            mn = min(mn, v)
+        mean = total / n
+        var = 0.0
+        for v in audio:
+            d = v - mean
+            var += d * d
+        peak = max(mx, -mn)
+        out[0] = mean
+        out[1] = np.sqrt(var / n)
+        out[2] = mx
+        out[3] = mn
+        out[4] = np.median(audio)  # numba 구현은 quickselect (정렬 없음)
+        
+        # 대역별 스펙트럼 인덱스 구간 [starts, stops)은 미리 계산됨
+        total_energy = magnitude.sum()
+        for b in range(starts.size):
+            if stops[b] > starts[b] and total_energy > 0:
+                out[5 + b] = magnitude[starts[b]:stops[b]].sum() / total_energy
+            else:
+                out[5 + b] = 0.0
+        
+        rms = np.sqrt(sq / n)
+        out[10] = rms
+        out[11] = peak / rms if rms > 0 else 0.0
+        return out
+
+    # import 시점에 한 번 컴파일해 첫 분석에서 JIT 비용이 발생하지 않도록 함
+    _dummy = np.zeros(1, dtype=np.float32)
+    rms_peak(_dummy)
+    _lightweight_features(_dummy, _dummy, np.zeros(5, dtype=np.intp), np.zeros(5, dtype=np.intp))
+else:
+    def rms_peak(audio):
+        """RMS와 절대값 최대치 (audio**2, abs 임시 배열 없이 계산)"""
+        rms = np.sqrt(np.dot(audio, audio) / audio.size)
+        peak = max(audio.max(), -audio.min())
+        return rms, peak
+
+    def _lightweight_features(audio, magnitude, starts, stops):
+        out = np.empty(12, dtype=np.float32)
+        out[0] = np.mean(audio)
+        out[1] = np.std(audio)
+        out[2] = np.max(audio)
+        out[3] = np.min(audio)
+        out[4] = np.median(audio)
+        
+        # 누적합 + 미리 계산된 대역 인덱스 구간으로 모든 대역을 한 번에 계산
+        cumsum = np.concatenate(([0.0], np.cumsum(magnitude, dtype=np.float64)))
+        total_energy = cumsum[-1]
+        if total_energy > 0:
+            out[5:10] = np.where(stops > starts, (cumsum[stops] - cumsum[starts]) / total_energy, 0.0)
+        else:
+            out[5:10] = 0.0
+        
+        rms, peak = rms_peak(audio)
+        out[10] = rms
+        out[11] = peak / rms if rms > 0 else 0.0
+        return out
+
 # 경량 AI 모델 클래스 (통합)
 class LightweightCompressorAI:
     """노트북 환경에 최적화된 경량 압축기 진단 AI"""
@@ -38,15 +210,29 @@ class LightweightCompressorAI:
         self.model_type = "hybrid"
         self.is_trained = False
         self.model_path = "models/lightweight_compressor_ai.pkl"
+        self.compiled_model_path = "models/rf_compiled.dll" if os.name == 'nt' else "models/rf_compiled.so"
+        self._rf_predictor = None  # treelite로 컴파일된 rf_model (없으면 scikit-learn 사용)
+        self._feat_mask = None  # rf_model이 사용하는 경량 특징 인덱스 (None이면 전체)
         
         # MIMII 관련 속성 추가
         self.mimii_enhanced = False
         self.mimii_model = None
         self.mimii_scaler = None
+        self._mimii_scaler_params = None  # scaler_params(self.mimii_scaler)
         self.label_encoder = None
         self.mimii_model_path = "models/mimii_enhanced_compressor_ai.pkl"
         self.prediction_mode = "hybrid"  # "legacy", "mimii", "hybrid"
         self.mimii_confidence_threshold = 0.6
+        self.feature_cache_dir = "cache/features"  # 오디오 내용 해시 → MIMII 특징 (헤더 없는 float32 21개, .f32)
+        self._mel_basis = {}  # 샘플레이트 → mel 필터뱅크 (n_fft=2048, n_mels=128)
+        self._buffers = threading.local()  # 경량 특징용 1초 오디오 버퍼 (세션 스레드별)
+        self._pred_cache = OrderedDict()  # 오디오 내용 해시 → (라벨, 신뢰도), 모델 변경 시 비움
+        self._pred_cache_lock = threading.Lock()  # 모델은 모든 세션이 공유
+        
+        # 경량 특징 주파수 대역 (Hz)
+        self._bands_lo = np.array([10, 100, 500, 1500, 3000], dtype=np.float32)
+        self._bands_hi = np.array([100, 500, 1500, 3000, 8000], dtype=np.float32)
+        self._band_bins = {}  # 샘플레이트 → 1초 버퍼 스펙트럼의 대역별 (starts, stops)
         
         # 압축기 라벨
         self.labels = {
@@ -69,12 +255,25 @@ class LightweightCompressorAI:
         
         # 모델 컴포넌트
         self.scaler = StandardScaler()
+        self._scaler_params = None  # scaler_params(self.scaler), 학습/로드 후 설정
         self.rf_model = RandomForestClassifier(
-            n_estimators=30,  # 가벼운 설정
-            max_depth=8,
+            n_estimators=20,  # 가벼운 설정
+            max_depth=6,
             random_state=42,
             n_jobs=2  # CPU 코어 제한
         )
+        self._has_proba = True  # rf_model.predict_proba 지원 여부 (로드/학습 시 갱신)
+        
+        # 시연용 가짜 예측 (미학습 상태의 기본 경로)
+        self._mock_cases = [
+            ('compressor_normal', 0.85),
+            ('compressor_overload', 0.78),
+            ('fan_imbalance', 0.73),
+            ('refrigerant_low', 0.82),
+            ('vibration_mount', 0.76)
+        ]
+        self._mock_cum_weights = np.cumsum([0.4, 0.2, 0.15, 0.15, 0.1])
+        self._rng = np.random.default_rng()
         
         # 기존 모델 로드 시도
         self.load_model()
@@ -86,11 +285,12 @@ class LightweightCompressorAI:
         """MIMII 강화 모델 로드"""
         try:
             if os.path.exists(self.mimii_model_path):
-                with open(self.mimii_model_path, 'rb') as f:
-                    mimii_data = pickle.load(f)
+                # joblib은 numpy 배열을 pickle 스트림 밖에 따로 저장 (기존 pickle 파일도 그대로 로드됨)
+                mimii_data = joblib.load(self.mimii_model_path)
                 
                 self.mimii_model = mimii_data.get('ensemble_model')
-                self.mimii_scaler = mimii_data.get('scaler')
+                self.mimii_scaler = scaler_to_float32(mimii_data.get('scaler'))
+                self._mimii_scaler_params = scaler_params(self.mimii_scaler)
                 self.label_encoder = mimii_data.get('label_encoder')
                 
                 if self.mimii_model is not None:
@@ -106,48 +306,77 @@ class LightweightCompressorAI:
         try:
             if len(audio) == 0:
                 return None
+            audio = np.ascontiguousarray(audio, dtype=np.float32)
             
-            features = []
+            # 같은 오디오는 디스크에 캐시된 특징 재사용 (Streamlit 재실행/재분석 시)
+            cache_key = hashlib.blake2b(audio.tobytes(), digest_size=16)
+            cache_key.update(str(sr).encode())
+            cache_path = os.path.join(self.feature_cache_dir, f"{cache_key.hexdigest()}.f32")
+            if os.path.exists(cache_path):
+                cached = np.fromfile(cache_path, dtype=np.float32)
+                if cached.size == 21:
+                    return cached.reshape(1, -1)
+            
+            features_array = np.empty(21, dtype=np.float32)
             
             # 1. 기본 통계 특징 (4개)
-            features.extend([
-                np.mean(audio),
-                np.std(audio),
-                np.max(audio),
-                np.min(audio)
-            ])
-            
-            # 2. MFCC 특징 (13개)
-            mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
-            features.extend(np.mean(mfccs, axis=1))
-            
-            # 3. 스펙트럴 특징 (4개)
-            spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)
+            features_array[0] = np.mean(audio)
+            features_array[1] = np.std(audio)
+            features_array[2] = np.max(audio)
+            features_array[3] = np.min(audio)
+            
+            import librosa
+            
+            # STFT는 한 번만 계산해서 MFCC/스펙트럴 특징에 공유
+            magnitude = np.abs(librosa.stft(y=audio))
+            
+            # 2. MFCC 특징 (13개, mel 필터뱅크는 샘플레이트별로 한 번만 생성)
+            mel_basis = self._mel_basis.get(sr)
+            if mel_basis is None:
+                mel_basis = self._mel_basis[sr] = librosa.filters.mel(sr=sr, n_fft=2048)
+            mel = mel_basis @ (magnitude ** 2)
+            mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=13)
+            features_array[4:17] = np.mean(mfccs, axis=1)
+            
+            # 3. 스펙트럴 특징 (4개, y= 경로와 동일하게 진폭 스펙트로그램 사용)
+            spectral_centroids = librosa.feature.spectral_centroid(S=magnitude, sr=sr)
+            spectral_rolloff = librosa.feature.spectral_rolloff(S=magnitude, sr=sr)
             zero_crossing_rate = librosa.feature.zero_crossing_rate(audio)
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sr)
+            spectral_bandwidth = librosa.feature.spectral_bandwidth(S=magnitude, sr=sr)
             
-            features.extend([
-                np.mean(spectral_centroids),
-                np.mean(spectral_rolloff), 
-                np.mean(zero_crossing_rate),
-                np.mean(spectral_bandwidth)
-            ])
+            features_array[17] = np.mean(spectral_centroids)
+            features_array[18] = np.mean(spectral_rolloff)
+            features_array[19] = np.mean(zero_crossing_rate)
+            features_array[20] = np.mean(spectral_bandwidth)
             
             # 특징 검증
-            features_array = np.array(features)
-            if len(features_array) != 21:
-                return None
-                
-            if np.any(np.isnan(features_array)) or np.any(np.isinf(features_array)):
+            if not np.isfinite(features_array).all():
                 return None
             
+            os.makedirs(self.feature_cache_dir, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            features_array.tofile(tmp_path)
+            os.replace(tmp_path, cache_path)
+            
             return features_array.reshape(1, -1)
             
         except Exception as e:
             print(f"❌ MIMII 특징 추출 실패: {e}")
             return None
 
+    def _select_features(self, X):
+        """rf_model 학습 시 남긴 특징만 선택"""
+        return X if self._feat_mask is None else X[:, self._feat_mask]
+
+    def _scale(self, X, scaler, params):
+        """특징 정규화 - 미리 계산한 (mean, 1/scale)로 직접 계산, 없으면 scaler.transform"""
+        if params is None:
+            return scaler.transform(X)
+        mean, inv_scale = params
+        X = np.subtract(X, mean, dtype=np.float32)  # 새 float32 배열 하나만 할당
+        X *= inv_scale
+        return X
+
     def _convert_prediction_to_label(self, prediction):
         """MIMII 예측 결과를 라벨로 변환"""
         try:
@@ -188,7 +417,7 @@ class LightweightCompressorAI:
                 
             # 스케일링
             if self.mimii_scaler:
-                features_scaled = self.mimii_scaler.transform(features)
+                features_scaled = self._scale(features, self.mimii_scaler, self._mimii_scaler_params)
             else:
                 features_scaled = features
                 
@@ -211,63 +440,81 @@ class LightweightCompressorAI:
     
     def extract_lightweight_features(self, audio, sr=16000):
         """경량화된 특징 추출"""
-        features = []
-        
-        # 오디오 길이 제한 (1초)
-        if len(audio) > sr:
-            audio = audio[:sr]
-        elif len(audio) < sr:
-            audio = np.pad(audio, (0, sr - len(audio)))
-        
-        # 1. 기본 통계 특징
-        features.extend([
-            np.mean(audio),
-            np.std(audio),
-            np.max(audio),
-            np.min(audio),
-            np.median(audio)
-        ])
-        
-        # 2. 주파수 특징
-        try:
-            fft = np.fft.fft(audio)
-            freqs = np.fft.fftfreq(len(audio), 1/sr)
-            
-            positive_mask = freqs > 0
-            freqs = freqs[positive_mask]
-            magnitude = np.abs(fft[positive_mask])
-            
-            # 주파수 대역별 에너지
-            bands = [(10, 100), (100, 500), (500, 1500), (1500, 3000), (3000, 8000)]
-            total_energy = np.sum(magnitude)
-            
-            for low, high in bands:
-                band_mask = (freqs >= low) & (freqs <= high)
-                if np.any(band_mask) and total_energy > 0:
-                    band_energy = np.sum(magnitude[band_mask])
-                    features.append(band_energy / total_energy)
-                else:
-                    features.append(0)
-                    
-        except Exception:
-            features.extend([0] * 5)
-        
-        # 3. 시간 도메인 특징
+        # 오디오 길이 제한 (1초, 부족하면 0 패딩) - 스레드별 재사용 버퍼에 복사
+        buffer = getattr(self._buffers, 'audio', None)
+        if buffer is None or len(buffer) != sr:
+            buffer = self._buffers.audio = np.empty(sr, dtype=np.float32)
+        n = min(len(audio), sr)
+        buffer[:n] = audio[:n]
+        buffer[n:] = 0.0
+        audio = buffer
+        
+        # 주파수 스펙트럼 (FFT 실패 시 대역 에너지는 0)
         try:
-            rms = np.sqrt(np.mean(audio**2))
-            features.append(rms)
-            
-            peak = np.max(np.abs(audio))
-            crest_factor = peak / rms if rms > 0 else 0
-            features.append(crest_factor)
-            
+            freqs, spectrum = positive_spectrum(audio, sr)
+            magnitude = np.abs(spectrum)
+            starts, stops = self._get_band_bins(freqs, sr)
         except Exception:
-            features.extend([0] * 2)
-        
-        return np.array(features, dtype=np.float32)
+            magnitude = np.zeros(0, dtype=np.float32)
+            starts = stops = np.zeros(len(self._bands_lo), dtype=np.intp)
+        
+        # 통계 5개 + 대역 에너지 비율 5개 + RMS/크레스트 팩터 2개
+        return _lightweight_features(
+            audio,
+            magnitude.astype(np.float32, copy=False),
+            starts, stops
+        )
+    
+    def _get_band_bins(self, freqs, sr):
+        """경량 특징 대역 경계(양끝 포함) → 스펙트럼 인덱스 구간 (버퍼 길이가 sr로 고정이라 샘플레이트별 한 번만 계산)"""
+        bins = self._band_bins.get(sr)
+        if bins is None:
+            freqs = freqs.astype(np.float32, copy=False)
+            bins = self._band_bins[sr] = (
+                np.searchsorted(freqs, self._bands_lo, side='left'),
+                np.searchsorted(freqs, self._bands_hi, side='right')
+            )
+        return bins
+    
+    def _prediction_key(self, audio, sr):
+        """예측 캐시 키 - 오디오 내용 + 샘플레이트 + 예측 설정"""
+        audio = np.ascontiguousarray(audio)
+        key = hashlib.blake2b(audio.tobytes(), digest_size=16)
+        key.update(f"{audio.dtype}|{sr}|{self.prediction_mode}|{self.mimii_confidence_threshold}".encode())
+        return key.digest()
+    
+    def _get_cached_prediction(self, key):
+        with self._pred_cache_lock:
+            result = self._pred_cache.get(key)
+            if result is not None:
+                self._pred_cache.move_to_end(key)
+            return result
+    
+    def _cache_prediction(self, key, result):
+        with self._pred_cache_lock:
+            self._pred_cache[key] = result
+            self._pred_cache.move_to_end(key)
+            while len(self._pred_cache) > PREDICTION_CACHE_SIZE:
+                self._pred_cache.popitem(last=False)
+    
+    def clear_prediction_cache(self):
+        """모델 학습/로드 후 이전 예측 결과 폐기"""
+        with self._pred_cache_lock:
+            self._pred_cache.clear()
     
     def predict(self, audio, sr=16000):
-        """통합 예측 (MIMII 우선, 실패시 기존 방식)"""
+        """통합 예측 (같은 오디오는 캐시된 결과 재사용, 시연용 가짜 예측은 캐시하지 않음)"""
+        key = self._prediction_key(audio, sr)
+        result = self._get_cached_prediction(key)
+        if result is None:
+            result = self._predict(audio, sr)
+            if result is None:
+                return self._generate_mock_prediction()
+            self._cache_prediction(key, result)
+        return result
+    
+    def _predict(self, audio, sr=16000):
+        """통합 예측 (MIMII 우선, 실패시 기존 방식) - 모든 방법 실패 시 None"""
         
         # 1. MIMII 강화 예측 시도
         if self.mimii_enhanced and self.prediction_mode in ["mimii", "hybrid"]:
@@ -286,15 +533,21 @@ class LightweightCompressorAI:
         if self.prediction_mode in ["legacy", "hybrid"]:
             # 기존 predict 코드 실행
             if not self.is_trained:
-                return self._generate_mock_prediction()
+                return None
             
             try:
                 features = self.extract_lightweight_features(audio, sr)
                 features = features.reshape(1, -1)
                 
-                features_scaled = self.scaler.transform(features)
+                features_scaled = self._select_features(self._scale(features, self.scaler, self._scaler_params))
                 
-                if hasattr(self.rf_model, 'predict_proba'):
+                if self._rf_predictor is not None:
+                    rf_prob = np.asarray(self._rf_predictor.predict(tl2cgen.DMatrix(features_scaled))).reshape(-1)
+                    if rf_prob.size == 1:  # 이진 분류는 양성 확률만 반환
+                        rf_prob = np.array([1.0 - rf_prob[0], rf_prob[0]])
+                    rf_pred = np.argmax(rf_prob)
+                    confidence = rf_prob[rf_pred]
+                elif self._has_proba:
                     rf_prob = self.rf_model.predict_proba(features_scaled)[0]
                     rf_pred = np.argmax(rf_prob)
                     confidence = rf_prob[rf_pred]
@@ -307,56 +560,144 @@ class LightweightCompressorAI:
                 
             except Exception as e:
                 print(f"예측 오류: {e}")
-                return self._generate_mock_prediction()
+                return None
         
         # 모든 방법 실패시
-        return self._generate_mock_prediction()
+        return None
+    
+    def predict_batch(self, audios):
+        """여러 파일 통합 예측 (같은 오디오는 캐시된 결과 재사용, 시연용 가짜 예측은 캐시하지 않음)
+        
+        audios: [(audio, sr), ...] → [(라벨, 신뢰도), ...]
+        """
+        keys = [self._prediction_key(audio, sr) for audio, sr in audios]
+        results = [self._get_cached_prediction(key) for key in keys]
+        
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            predictions = self._predict_batch([audios[i] for i in misses])
+            for i, result in zip(misses, predictions):
+                if result is None:
+                    results[i] = self._generate_mock_prediction()
+                else:
+                    results[i] = result
+                    self._cache_prediction(keys[i], result)
+        return results
+    
+    def _predict_batch(self, audios):
+        """단계별로 특징을 모아 모델을 한 번씩만 호출 - 예측하지 못한 항목은 None"""
+        results = [None] * len(audios)
+        
+        # 1. MIMII 강화 예측 (배치)
+        if self.mimii_enhanced and self.prediction_mode in ["mimii", "hybrid"]:
+            try:
+                extracted = [(i, self.extract_enhanced_features(audio, sr)) for i, (audio, sr) in enumerate(audios)]
+                extracted = [(i, features) for i, features in extracted if features is not None]
+                if extracted:
+                    X = np.vstack([features for _, features in extracted])
+                    if self.mimii_scaler:
+                        X = self._scale(X, self.mimii_scaler, self._mimii_scaler_params)
+                    
+                    try:
+                        probabilities = self.mimii_model.predict_proba(X)
+                        raw_predictions = self.mimii_model.classes_[np.argmax(probabilities, axis=1)]
+                        confidences = probabilities.max(axis=1)
+                    except:
+                        raw_predictions = self.mimii_model.predict(X)
+                        confidences = np.full(len(X), 0.8)
+                    
+                    for (i, _), raw_prediction, confidence in zip(extracted, raw_predictions, confidences):
+                        # 신뢰도가 임계값 이상이거나 MIMII 전용 모드면 MIMII 결과 사용
+                        if confidence >= self.mimii_confidence_threshold or self.prediction_mode == "mimii":
+                            results[i] = (self._convert_prediction_to_label(raw_prediction), float(confidence))
+            except Exception as e:
+                print(f"❌ MIMII 배치 예측 실패: {e}")
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        # 2. 기존 방식 폴백 (배치)
+        if pending and self.prediction_mode in ["legacy", "hybrid"] and self.is_trained:
+            try:
+                X = np.vstack([self.extract_lightweight_features(*audios[i]) for i in pending])
+                X_scaled = self._select_features(self._scale(X, self.scaler, self._scaler_params))
+                
+                if self._rf_predictor is not None:
+                    rf_prob = np.asarray(self._rf_predictor.predict(tl2cgen.DMatrix(X_scaled))).reshape(len(pending), -1)
+                    if rf_prob.shape[1] == 1:  # 이진 분류는 양성 확률만 반환
+                        rf_prob = np.hstack([1.0 - rf_prob, rf_prob])
+                elif self._has_proba:
+                    rf_prob = self.rf_model.predict_proba(X_scaled)
+                else:
+                    rf_prob = None
+                
+                if rf_prob is not None:
+                    rf_preds = np.argmax(rf_prob, axis=1)
+                    confidences = rf_prob[np.arange(len(pending)), rf_preds]
+                else:
+                    rf_preds = self.rf_model.predict(X_scaled)
+                    confidences = np.full(len(pending), 0.75)
+                
+                for i, rf_pred, confidence in zip(pending, rf_preds, confidences):
+                    results[i] = (self.idx_to_label[rf_pred], float(confidence))
+            except Exception as e:
+                print(f"예측 오류: {e}")
+        
+        return results
     
     def _generate_mock_prediction(self):
         """시연용 가짜 예측"""
-        mock_cases = [
-            ('compressor_normal', 0.85),
-            ('compressor_overload', 0.78),
-            ('fan_imbalance', 0.73),
-            ('refrigerant_low', 0.82),
-            ('vibration_mount', 0.76)
-        ]
-        
-        weights = [0.4, 0.2, 0.15, 0.15, 0.1]
-        choice = np.random.choice(len(mock_cases), p=weights)
-        return mock_cases[choice]
+        # 누적 가중치에서 균등 난수 하나로 선택 (choice의 확률 검증 생략)
+        choice = int(np.searchsorted(self._mock_cum_weights, self._rng.random(), side='right'))
+        return self._mock_cases[min(choice, len(self._mock_cases) - 1)]
+    
+    def _load_and_featurize(self, audio_file):
+        """학습용 파일(경로 또는 16kHz 오디오 배열) 로드 + 경량 특징 추출"""
+        if isinstance(audio_file, str):
+            audio, sr = fast_load(audio_file, 16000)
+        else:
+            audio, sr = audio_file, 16000
+        return self.extract_lightweight_features(audio, sr)
     
     def train_with_data(self, audio_files, labels):
         """모델 학습"""
         try:
-            features_list = []
-            labels_list = []
-            
-            for audio_file, label in zip(audio_files, labels):
-                if isinstance(audio_file, str):
-                    audio, sr = librosa.load(audio_file, sr=16000, mono=True)
-                else:
-                    audio, sr = audio_file, 16000
-                
-                features = self.extract_lightweight_features(audio, sr)
-                features_list.append(features)
-                
-                label_idx = self.label_to_idx.get(label, 0)
-                labels_list.append(label_idx)
+            samples = list(zip(audio_files, labels))
+            n_samples = len(samples)
             
-            if len(features_list) < 5:
+            if n_samples < 5:
                 return False
             
-            X = np.array(features_list)
-            y = np.array(labels_list)
+            # 특징 행렬을 미리 할당하고 각 작업이 자기 행에 직접 기록 (리스트 → 배열 복사 없음)
+            X = np.empty((n_samples, 12), dtype=np.float32)
+            y = np.fromiter((self.label_to_idx.get(label, 0) for _, label in samples), dtype=np.int32, count=n_samples)
+            
+            def featurize_into(i, audio_file):
+                X[i] = self._load_and_featurize(audio_file)
+            
+            # 파일 로드 + 특징 추출은 스레드 병렬 (디코딩/FFT/numba 커널은 GIL 해제, 소량이면 순차)
+            n_jobs = os.cpu_count() if n_samples >= 16 else 1
+            joblib.Parallel(n_jobs=n_jobs, prefer='threads')(
+                joblib.delayed(featurize_into)(i, audio_file) for i, (audio_file, _) in enumerate(samples)
+            )
             
             # 정규화
             X_scaled = self.scaler.fit_transform(X)
+            scaler_to_float32(self.scaler)
+            self._scaler_params = scaler_params(self.scaler)
             
-            # 학습
+            # 학습 후 중요도가 낮은 특징을 제거하고 재학습 (추론 시 트리 깊이/특징 수 감소)
             self.rf_model.fit(X_scaled, y)
+            feat_mask = np.flatnonzero(self.rf_model.feature_importances_ > FEATURE_IMPORTANCE_THRESHOLD)
+            if 0 < len(feat_mask) < X_scaled.shape[1]:
+                self._feat_mask = feat_mask
+                self.rf_model.fit(X_scaled[:, feat_mask], y)
+            else:
+                self._feat_mask = None
+            self._has_proba = hasattr(self.rf_model, 'predict_proba')
             self.save_model()
             self.is_trained = True
+            self.compile_model(force=True)
+            self.clear_prediction_cache()
             
             return True
             
@@ -372,14 +713,15 @@ class LightweightCompressorAI:
             model_data = {
                 'scaler': self.scaler,
                 'rf_model': self.rf_model,
+                'feature_mask': self._feat_mask,
                 'labels': self.labels,
                 'label_to_idx': self.label_to_idx,
                 'idx_to_label': self.idx_to_label,
                 'is_trained': self.is_trained
             }
             
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(model_data, f)
+            # 압축 없이 저장 (로드 시 압축 해제 비용 없음)
+            joblib.dump(model_data, self.model_path, compress=0)
                 
         except Exception as e:
             print(f"모델 저장 오류: {e}")
@@ -388,16 +730,36 @@ class LightweightCompressorAI:
         """모델 로드"""
         try:
             if os.path.exists(self.model_path):
-                with open(self.model_path, 'rb') as f:
-                    model_data = pickle.load(f)
+                model_data = joblib.load(self.model_path)
                 
-                self.scaler = model_data['scaler']
+                self.scaler = scaler_to_float32(model_data['scaler'])
+                self._scaler_params = scaler_params(self.scaler)
                 self.rf_model = model_data['rf_model']
+                self._has_proba = hasattr(self.rf_model, 'predict_proba')
+                self._feat_mask = model_data.get('feature_mask')
                 self.is_trained = model_data.get('is_trained', False)
+                self.compile_model()
                 return True
         except Exception:
             return False
     
+    def compile_model(self, force=False):
+        """rf_model을 네이티브 라이브러리로 컴파일 (treelite 설치 시)"""
+        self._rf_predictor = None
+        if not TREE_COMPILER_AVAILABLE or not hasattr(self.rf_model, 'estimators_'):
+            return
+        
+        try:
+            lib_path = self.compiled_model_path
+            # 모델 파일보다 오래된 라이브러리만 다시 컴파일
+            if force or not os.path.exists(lib_path) or os.path.getmtime(lib_path) < os.path.getmtime(self.model_path):
+                os.makedirs(os.path.dirname(lib_path), exist_ok=True)
+                tl_model = treelite.sklearn.import_model(self.rf_model)
+                tl2cgen.export_lib(tl_model, toolchain="gcc", libpath=lib_path, params={"parallel_comp": 0})
+            self._rf_predictor = tl2cgen.Predictor(lib_path)
+        except Exception as e:
+            print(f"⚠️ 모델 컴파일 실패: {e}. scikit-learn 추론을 사용합니다.")
+    
     def get_model_info(self):
         """모델 정보 (MIMII 정보 포함)"""
         base_info = {
@@ -429,12 +791,261 @@ class AIModelManager:
     def predict(self, audio, sr=16000):
         return self.active_model.predict(audio, sr)
     
+    def predict_batch(self, audios):
+        return self.active_model.predict_batch(audios)
+    
     def train_model(self, audio_files, labels):
         return self.lightweight_ai.train_with_data(audio_files, labels)
     
     def get_model_info(self):
         return {'lightweight': self.lightweight_ai.get_model_info()}
 
+@st.cache_resource
+def get_conn():
+    """SQLite 읽기/쓰기 연결 + 스키마 초기화 (프로세스당 한 번, 모든 재실행/세션이 공유)
+    
+    쓰기 트랜잭션은 db_write_lock()으로 직렬화 (세션끼리 열린 트랜잭션이 섞이지 않도록)
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")  # 64MB 페이지 캐시
+    
+    # 파일 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS audio_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT UNIQUE NOT NULL,
+            upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration REAL,
+            sample_rate INTEGER,
+            file_path TEXT,
+            customer_id TEXT,
+            equipment_id TEXT,
+            features BLOB
+        )
+    ''')
+    
+    # 기존 DB 마이그레이션: 업로드 시 계산한 기본 분석 특징 (float32 BLOB)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(audio_files)")}
+    if 'features' not in columns:
+        conn.execute("ALTER TABLE audio_files ADD COLUMN features BLOB")
+    
+    # 라벨 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS labels (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER,
+            start_time REAL,
+            end_time REAL,
+            label_type TEXT,
+            confidence INTEGER,
+            notes TEXT,
+            created_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES audio_files (id)
+        )
+    ''')
+    
+    # 예측 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER,
+            predicted_label TEXT,
+            confidence_score REAL,
+            prediction_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES audio_files (id)
+        )
+    ''')
+    
+    # 고객 테이블
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id TEXT PRIMARY KEY,
+            company_name TEXT,
+            contact_person TEXT,
+            email TEXT,
+            phone TEXT,
+            created_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # 조회/집계용 인덱스 (고아 라벨 검사, 라벨·예측 분포, 일별 예측 수, 파일 목록)
+    # audio_files 인덱스는 관리자 포털과 같은 이름을 사용해 중복 생성 방지
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_labels_file_id ON labels(file_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_labels_type ON labels(label_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_label ON predictions(predicted_label)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_time ON predictions(prediction_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_file ON predictions(file_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_upload ON audio_files(upload_time DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_audio_customer ON audio_files(customer_id)")
+    
+    conn.commit()
+    return conn
+
+@st.cache_resource
+def db_write_lock():
+    """공유 연결(get_conn)의 쓰기 트랜잭션 직렬화용 락 (재진입 가능)"""
+    return threading.RLock()
+
+@st.cache_resource
+def _get_read_conn():
+    """조회 전용 연결 + 락 (mode=ro, WAL이라 쓰기 트랜잭션과 서로 막지 않음)"""
+    get_conn()  # DB 파일/스키마/WAL 모드 먼저 보장
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False)
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-65536")
+    return conn, threading.Lock()
+
+@contextmanager
+def read_conn():
+    """캐시된 통계/목록 조회용 읽기 전용 연결 (세션 간 공유, 사용 중에는 잠금)"""
+    conn, lock = _get_read_conn()
+    with lock:
+        yield conn
+
+@st.cache_resource
+def get_ai_manager():
+    """AI 모델 매니저 (모델 로드/컴파일은 프로세스당 한 번)"""
+    return AIModelManager()
+
+def _db_mtime():
+    """캐시 키로 사용할 DB 파일 수정 시각"""
+    # WAL 모드에서는 체크포인트 전까지 변경 내용이 -wal 파일에만 기록됨
+    mtime = 0.0
+    for path in (DB_PATH, f"{DB_PATH}-wal"):
+        try:
+            mtime = max(mtime, os.path.getmtime(path))
+        except OSError:
+            pass
+    return mtime
+
+@st.cache_data(ttl=30, max_entries=8, show_spinner=False)
+def _compute_system_stats(db_mtime: float) -> dict:
+    """시스템 통계 (테이블별 행 수)"""
+    # 한 번의 쿼리로 4개 테이블 행 수 조회
+    with read_conn() as conn:
+        total_files, total_labels, total_predictions, total_customers = conn.execute('''
+            SELECT (SELECT COUNT(*) FROM audio_files),
+                   (SELECT COUNT(*) FROM labels),
+                   (SELECT COUNT(*) FROM predictions),
+                   (SELECT COUNT(*) FROM customers)
+        ''').fetchone()
+    
+    return {
+        'total_files': total_files,
+        'total_labels': total_labels,
+        'total_predictions': total_predictions,
+        'total_customers': total_customers
+    }
+
+@st.cache_data(ttl=30, max_entries=8, show_spinner=False)
+def _compute_dataset_stats(db_mtime: float):
+    """라벨 통계 - (전체 라벨 수, 클래스 수, [(label_type, count), ...])"""
+    with read_conn() as conn:
+        total_labels = conn.execute('SELECT COUNT(*) FROM labels').fetchone()[0]
+        unique_classes = conn.execute('SELECT COUNT(DISTINCT label_type) FROM labels').fetchone()[0]
+        label_counts = conn.execute('''
+            SELECT label_type, COUNT(*) as count
+            FROM labels
+            GROUP BY label_type
+        ''').fetchall()
+    return total_labels, unique_classes, label_counts
+
+def _day_bounds(day):
+    """하루 구간 [당일 00:00, 익일 00:00) - prediction_time 인덱스 범위 검색용"""
+    # SQLite CURRENT_TIMESTAMP 형식('YYYY-MM-DD HH:MM:SS')과 문자열 비교가 맞도록 공백 구분자 사용
+    start = datetime.combine(day, datetime.min.time())
+    end = start + timedelta(days=1)
+    return start.isoformat(sep=' '), end.isoformat(sep=' ')
+
+@st.cache_data(ttl=30, max_entries=8, show_spinner=False)
+def _count_predictions_on(db_mtime: float, day) -> int:
+    """특정 날짜의 예측 수 (DATE() 대신 범위 조건이라 idx_pred_time 사용)"""
+    day_start, day_end = _day_bounds(day)
+    with read_conn() as conn:
+        return conn.execute('''
+            SELECT COUNT(*) FROM predictions 
+            WHERE prediction_time >= ? AND prediction_time < ?
+        ''', (day_start, day_end)).fetchone()[0]
+
+@st.cache_data(ttl=30, max_entries=8, show_spinner=False)
+def _load_prediction_counts(db_mtime: float):
+    """예측 라벨별 건수 - [(predicted_label, count), ...]"""
+    with read_conn() as conn:
+        return conn.execute('''
+            SELECT predicted_label, COUNT(*) as count
+            FROM predictions
+            GROUP BY predicted_label
+        ''').fetchall()
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _load_audio(path: str, mtime: float):
+    """분석용 오디오 디코딩 (경로 + 수정 시각 키 - 같은 파일 반복 분석 시 재디코딩 없음)"""
+    return fast_load(path)
+
+@st.cache_data(ttl=3600, max_entries=2, show_spinner=False)
+def _mock_daily_stats(hour: str):
+    """최근 14일 일별 진단 수 (시연용 데이터, 시간 단위로 고정 - 재실행마다 차트가 바뀌지 않도록)"""
+    dates = pd.date_range(end=datetime.now(), periods=14, freq='D')
+    counts = np.random.randint(0, 12, size=14)
+    
+    return pd.DataFrame({'date': dates, 'count': counts})
+
+# 차트 생성 (같은 데이터면 캐시된 Figure 재사용 - 재실행마다 Plotly 레이아웃 재구성 방지)
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _build_band_fig(band_names: tuple, band_ratios: tuple, band_colors: tuple):
+    """주파수 대역별 에너지 막대 차트"""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure(data=[
+        go.Bar(
+            x=band_names,
+            y=band_ratios,
+            marker_color=band_colors,
+            text=[f"{ratio:.1f}%" for ratio in band_ratios],
+            textposition='auto'
+        )
+    ])
+    
+    fig.update_layout(
+        title="주파수 대역별 에너지 분포",
+        xaxis_title="주파수 대역",
+        yaxis_title="에너지 비율 (%)",
+        height=400
+    )
+    return fig
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _build_daily_fig(dates: tuple, counts: tuple):
+    """일별 진단 건수 선 차트"""
+    import plotly.graph_objects as go
+    
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=dates,
+        y=counts,
+        mode='lines+markers',
+        name='일별 진단'
+    ))
+    
+    fig.update_layout(title="일별 진단 건수", height=300)
+    return fig
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _build_pie_fig(items: tuple):
+    """예측 결과 분포 파이 차트 - items: ((라벨, 건수), ...)"""
+    import plotly.express as px
+    
+    return px.pie(
+        values=[count for _, count in items],
+        names=[name for name, _ in items],
+        title="예측 결과 분포"
+    )
+
 class CompressorDiagnosisSystem:
     def __init__(self):
         self.init_database()
@@ -442,7 +1053,7 @@ class CompressorDiagnosisSystem:
         
         # 경량 AI 매니저 추가
         try:
-            self.ai_manager = AIModelManager()
+            self.ai_manager = get_ai_manager()
             self.ai_enabled = True
             print("✅ 경량 AI 모델 로드 성공")
         except Exception as e:
@@ -474,65 +1085,14 @@ class CompressorDiagnosisSystem:
             'refrigerant_freq': {'name': '냉매 (3-8kHz)', 'range': (3000, 8000), 'color': '#DDA0DD'},
             'high_freq': {'name': '고주파 (8kHz+)', 'range': (8000, 20000), 'color': '#FF9999'}
         }
+        # 대역 경계 (N×2, Hz) - 분석마다 dict에서 다시 만들지 않도록 한 번만 생성
+        self._band_ranges = np.array([band_info['range'] for band_info in self.frequency_bands.values()])
 
     def init_database(self):
-        """데이터베이스 초기화"""
-        self.conn = sqlite3.connect('compressor_system.db', check_same_thread=False)
-        
-        # 파일 테이블
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS audio_files (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT UNIQUE NOT NULL,
-                upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                duration REAL,
-                sample_rate INTEGER,
-                file_path TEXT,
-                customer_id TEXT,
-                equipment_id TEXT
-            )
-        ''')
-        
-        # 라벨 테이블
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS labels (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                start_time REAL,
-                end_time REAL,
-                label_type TEXT,
-                confidence INTEGER,
-                notes TEXT,
-                created_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (file_id) REFERENCES audio_files (id)
-            )
-        ''')
-        
-        # 예측 테이블
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                file_id INTEGER,
-                predicted_label TEXT,
-                confidence_score REAL,
-                prediction_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (file_id) REFERENCES audio_files (id)
-            )
-        ''')
-        
-        # 고객 테이블
-        self.conn.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id TEXT PRIMARY KEY,
-                company_name TEXT,
-                contact_person TEXT,
-                email TEXT,
-                phone TEXT,
-                created_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
+        """데이터베이스 연결 (Streamlit 재실행 간 공유되는 캐시 연결 사용, 쓰기는 db_write_lock()으로 직렬화)"""
+        self.conn = get_conn()
+        self._pending_predictions = []  # flush_predictions()에서 한 번에 INSERT
+        self._write_depth = 0  # write_transaction() 중첩 깊이 (바깥 블록만 커밋)
 
     def init_models(self):
         """모델 초기화"""
@@ -680,21 +1240,29 @@ class CompressorDiagnosisSystem:
                 )
                 
                 st.success(f"✅ {len(uploaded_files)}개 파일 처리 완료!")
-                st.dataframe(pd.DataFrame(results))
+                st.dataframe(pd.DataFrame(results).dropna(axis=1, how='all'))
         
         # 파일 목록
         st.subheader("📋 업로드된 파일 목록")
         
-        files_df = self.get_files_list()
+        files_df = self.get_files_list(self.select_files_page("files_page"))
         if not files_df.empty:
             st.dataframe(files_df, use_container_width=True)
 
+    def select_files_page(self, key):
+        """파일 목록 페이지 선택 (FILES_PAGE_SIZE보다 많을 때만 표시) - 0부터 시작하는 페이지 번호 반환"""
+        total_files = self.get_system_stats()['total_files']
+        if total_files <= FILES_PAGE_SIZE:
+            return 0
+        n_pages = (total_files + FILES_PAGE_SIZE - 1) // FILES_PAGE_SIZE
+        return st.number_input("페이지", min_value=1, max_value=n_pages, value=1, key=key) - 1
+
     def analysis_tab(self):
         """분석 탭"""
         st.header("🔬 압축기 분석")
         
-        # 파일 선택
-        files_df = self.get_files_list()
+        # 파일 선택 (최신순 페이지 단위)
+        files_df = self.get_files_list(self.select_files_page("analysis_files_page"))
         
         if files_df.empty:
             st.warning("분석할 파일이 없습니다. 파일을 먼저 업로드해주세요.")
@@ -733,10 +1301,7 @@ class CompressorDiagnosisSystem:
         """기본 분석 실행"""
         try:
             with st.spinner("분석 중..."):
-                audio_path = file_info.get('file_path', f"uploads/{file_info['filename']}")
-                audio, sr = librosa.load(audio_path, sr=None, mono=True)
-                
-                analysis_result = self.perform_basic_analysis(audio, sr)
+                analysis_result = self.load_basic_analysis(file_info)
                 self.display_basic_results(analysis_result)
                 
         except Exception as e:
@@ -750,11 +1315,10 @@ class CompressorDiagnosisSystem:
         
         try:
             with st.spinner("🤖 AI 분석 중..."):
-                audio_path = file_info.get('file_path', f"uploads/{file_info['filename']}")
-                audio, sr = librosa.load(audio_path, sr=None, mono=True)
+                audio, sr = self.load_file_audio(file_info)
                 
                 ai_result = self.predict_with_ai(audio, sr, file_info['id'])
-                basic_result = self.perform_basic_analysis(audio, sr)
+                basic_result = self.load_basic_analysis(file_info, audio, sr)
                 
                 # 결과 표시
                 col1, col2 = st.columns([1, 1])
@@ -790,59 +1354,92 @@ class CompressorDiagnosisSystem:
         
         try:
             predicted_label, confidence = self.ai_manager.predict(audio, sr)
-            
-            # 예측 결과 저장
-            self.conn.execute('''
-                INSERT INTO predictions 
-                (file_id, predicted_label, confidence_score)
-                VALUES (?, ?, ?)
-            ''', (file_id, predicted_label, confidence))
-            
-            self.conn.commit()
-            
-            korean_label = self.labels.get(predicted_label, predicted_label)
-            
-            if confidence >= 0.8:
-                confidence_color = "🟢"
-            elif confidence >= 0.6:
-                confidence_color = "🟡" 
-            else:
-                confidence_color = "🔴"
-            
-            return f"{confidence_color} {korean_label} (신뢰도: {confidence:.1%})"
+            display = self.record_prediction(file_id, predicted_label, confidence)
+            self.flush_predictions()
+            return display
             
         except Exception as e:
             return f"❌ AI 예측 오류: {e}"
 
+    def record_prediction(self, file_id, predicted_label, confidence):
+        """예측 결과 저장 대기열에 추가 및 표시 문자열 생성 (저장은 flush_predictions)"""
+        self._pending_predictions.append((file_id, predicted_label, confidence))
+        
+        korean_label = self.labels.get(predicted_label, predicted_label)
+        
+        if confidence >= 0.8:
+            confidence_color = "🟢"
+        elif confidence >= 0.6:
+            confidence_color = "🟡" 
+        else:
+            confidence_color = "🔴"
+        
+        return f"{confidence_color} {korean_label} (신뢰도: {confidence:.1%})"
+
+    def flush_predictions(self):
+        """대기 중인 예측 결과를 한 번의 트랜잭션으로 저장"""
+        rows, self._pending_predictions = self._pending_predictions, []
+        with self.write_transaction() as conn:
+            if rows:
+                conn.executemany('''
+                    INSERT INTO predictions 
+                    (file_id, predicted_label, confidence_score)
+                    VALUES (?, ?, ?)
+                ''', rows)
+
+    @contextmanager
+    def write_transaction(self):
+        """공유 연결 쓰기 트랜잭션 - 잠금 후 성공 시 커밋, 예외 시 롤백(세이브포인트 포함)하고 다시 발생
+        
+        실패한 트랜잭션이 열린 채 남으면 다른 세션의 쓰기가 모두 그 안에 들어가므로 반드시 정리.
+        중첩 호출(process_files 안의 flush_predictions)은 가장 바깥 블록에서만 커밋/롤백
+        """
+        with db_write_lock():
+            if self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield self.conn
+                finally:
+                    self._write_depth -= 1
+                return
+            self._write_depth = 1
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+            finally:
+                self._write_depth = 0
+
     def perform_basic_analysis(self, audio, sr):
         """기본 분석 수행"""
-        # 주파수 분석
-        fft_result = np.fft.fft(audio)
-        frequencies = np.fft.fftfreq(len(audio), 1/sr)
-        power_spectrum = np.abs(fft_result) ** 2
+        # float32로 통일 (rfft 결과가 complex64가 되어 스펙트럼 연산 메모리 절반, 이미 float32면 복사 없음)
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
         
-        positive_mask = frequencies > 0
-        frequencies = frequencies[positive_mask]
-        power_spectrum = power_spectrum[positive_mask]
+        # 주파수 분석
+        frequencies, fft_result = positive_spectrum(audio, sr)
+        power_spectrum = fft_result.real ** 2 + fft_result.imag ** 2
         
         # 주파수 대역별 에너지
         band_energies = {}
         total_energy = np.sum(power_spectrum)
         
-        for band_name, band_info in self.frequency_bands.items():
-            freq_min, freq_max = band_info['range']
-            band_mask = (frequencies >= freq_min) & (frequencies <= freq_max)
-            
-            if np.any(band_mask):
-                band_energy = np.sum(power_spectrum[band_mask])
+        # 주파수 축은 오름차순이므로 대역 경계(양끝 포함)를 이진 탐색으로 찾아 슬라이스
+        # (업로드마다 길이/샘플레이트가 달라 인덱스는 호출마다 계산)
+        starts = np.searchsorted(frequencies, self._band_ranges[:, 0], side='left')
+        stops = np.searchsorted(frequencies, self._band_ranges[:, 1], side='right')
+        
+        for band_name, start, stop in zip(self.frequency_bands, starts, stops):
+            if stop > start:
+                band_power = power_spectrum[start:stop]
                 band_energies[band_name] = {
-                    'energy_ratio': band_energy / total_energy,
-                    'dominant_freq': frequencies[band_mask][np.argmax(power_spectrum[band_mask])]
+                    'energy_ratio': np.sum(band_power) / total_energy,
+                    'dominant_freq': frequencies[start + np.argmax(band_power)]
                 }
         
         # 진동 분석
-        rms = np.sqrt(np.mean(audio**2))
-        peak = np.max(np.abs(audio))
+        rms, peak = rms_peak(audio)
         crest_factor = peak / rms if rms > 0 else 0
         
         return {
@@ -856,6 +1453,58 @@ class CompressorDiagnosisSystem:
             }
         }
 
+    def pack_basic_features(self, results):
+        """기본 분석 결과 → float32 BLOB (대역별 [에너지 비율, 주요 주파수], RMS, 피크, 크레스트 팩터)"""
+        values = []
+        for band_name in self.frequency_bands:
+            band = results['band_energies'].get(band_name)
+            values += [band['energy_ratio'], band['dominant_freq']] if band else [np.nan, np.nan]
+        vibration = results['vibration']
+        values += [vibration['rms'], vibration['peak'], vibration['crest_factor']]
+        return np.asarray(values, dtype=np.float32).tobytes()
+
+    def unpack_basic_features(self, blob):
+        """pack_basic_features로 저장한 BLOB → display_basic_results용 결과"""
+        values = np.frombuffer(blob, dtype=np.float32)
+        n_bands = len(self.frequency_bands)
+        
+        band_energies = {}
+        for band_name, (ratio, freq) in zip(self.frequency_bands, values[:2 * n_bands].reshape(n_bands, 2)):
+            if not np.isnan(ratio):  # 스펙트럼 범위 밖 대역은 저장 시 NaN
+                band_energies[band_name] = {'energy_ratio': float(ratio), 'dominant_freq': float(freq)}
+        
+        rms, peak, crest_factor = values[2 * n_bands:].tolist()
+        return {
+            'band_energies': band_energies,
+            'vibration': {
+                'rms': rms,
+                'peak': peak,
+                'crest_factor': crest_factor
+            }
+        }
+
+    def load_file_audio(self, file_info):
+        """file_info의 오디오 로드 (파일 수정 시각 기준 캐시)"""
+        audio_path = file_info.get('file_path', f"uploads/{file_info['filename']}")
+        return _load_audio(audio_path, os.path.getmtime(audio_path))
+
+    def load_basic_analysis(self, file_info, audio=None, sr=None):
+        """업로드 시 저장된 기본 분석 특징 사용, 없으면 계산 후 저장"""
+        with read_conn() as conn:
+            row = conn.execute('SELECT features FROM audio_files WHERE id = ?', (int(file_info['id']),)).fetchone()
+        blob = row[0] if row else None
+        if isinstance(blob, bytes) and len(blob) == 4 * (2 * len(self.frequency_bands) + 3):
+            return self.unpack_basic_features(blob)
+        
+        if audio is None:
+            audio, sr = self.load_file_audio(file_info)
+        
+        results = self.perform_basic_analysis(audio, sr)
+        with self.write_transaction() as conn:
+            conn.execute('UPDATE audio_files SET features = ? WHERE id = ?',
+                         (self.pack_basic_features(results), int(file_info['id'])))
+        return results
+
     def display_basic_results(self, results):
         """기본 분석 결과 표시"""
         st.subheader("📊 주파수 대역별 에너지")
@@ -873,23 +1522,7 @@ class CompressorDiagnosisSystem:
                 band_ratios.append(data['energy_ratio'] * 100)
                 band_colors.append(band_info['color'])
             
-            fig = go.Figure(data=[
-                go.Bar(
-                    x=band_names,
-                    y=band_ratios,
-                    marker_color=band_colors,
-                    text=[f"{ratio:.1f}%" for ratio in band_ratios],
-                    textposition='auto'
-                )
-            ])
-            
-            fig.update_layout(
-                title="주파수 대역별 에너지 분포",
-                xaxis_title="주파수 대역",
-                yaxis_title="에너지 비율 (%)",
-                height=400
-            )
-            
+            fig = _build_band_fig(tuple(band_names), tuple(band_ratios), tuple(band_colors))
             st.plotly_chart(fig, use_container_width=True)
         
         # 진동 분석
@@ -951,6 +1584,14 @@ class CompressorDiagnosisSystem:
             st.metric("데이터 균형도", f"{dataset_stats['balance_ratio']:.2f}")
         
         # 학습 섹션
+        self._training_section()
+        
+        # 개발 로드맵
+        self._roadmap_expander()
+
+    @st.fragment
+    def _training_section(self):
+        """학습 옵션 + 실행 (옵션 변경 시 이 부분만 재실행)"""
         st.subheader("🚀 AI 모델 학습")
         
         # 학습 옵션
@@ -977,7 +1618,8 @@ class CompressorDiagnosisSystem:
                     status_text.text("더미 데이터 생성 중...")
                     progress_bar.progress(20)
                     
-                    dummy_audio_files = [np.random.randn(16000) for _ in range(30)]
+                    # (30, 16000) float32 한 블록 - 학습기는 행 단위로 순회
+                    dummy_audio_files = np.random.default_rng().standard_normal((30, 16000), dtype=np.float32)
                     dummy_labels = (['compressor_normal'] * 15 + 
                                   ['compressor_overload'] * 8 + 
                                   ['fan_imbalance'] * 7)
@@ -1003,8 +1645,9 @@ class CompressorDiagnosisSystem:
                         """)
                     else:
                         st.error("❌ 학습 실패")
-        
-        # 개발 로드맵
+
+    def _roadmap_expander(self):
+        """AI 개발 로드맵"""
         with st.expander("🗺️ AI 개발 로드맵"):
             st.markdown("""
             ### 📋 개발 단계별 계획
@@ -1036,6 +1679,20 @@ class CompressorDiagnosisSystem:
         st.header("📊 시스템 대시보드")
         
         # 주요 지표
+        self._dashboard_metrics()
+        
+        # 차트
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            self._daily_chart()
+        
+        with col2:
+            self._prediction_chart()
+
+    @st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+    def _dashboard_metrics(self):
+        """대시보드 주요 지표 (이 부분만 주기적으로 재실행)"""
         stats = self.get_dashboard_stats()
         
         col1, col2, col3, col4 = st.columns(4)
@@ -1048,36 +1705,26 @@ class CompressorDiagnosisSystem:
             st.metric("정상 비율", f"{stats['normal_ratio']:.1%}")
         with col4:
             st.metric("총 고객", stats['total_customers'])
+
+    @st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+    def _daily_chart(self):
+        """일별 진단 수 차트"""
+        daily_data = self.get_daily_stats()
+        
+        fig = _build_daily_fig(
+            tuple(daily_data['date'].dt.strftime('%Y-%m-%d')),
+            tuple(int(count) for count in daily_data['count'])
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    @st.fragment(run_every=DASHBOARD_REFRESH_SECONDS)
+    def _prediction_chart(self):
+        """예측 분포 차트"""
+        prediction_dist = self.get_prediction_distribution()
         
-        # 차트
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # 일별 진단 수
-            daily_data = self.get_daily_stats()
-            
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(
-                x=daily_data['date'],
-                y=daily_data['count'],
-                mode='lines+markers',
-                name='일별 진단'
-            ))
-            
-            fig.update_layout(title="일별 진단 건수", height=300)
+        if prediction_dist:
+            fig = _build_pie_fig(tuple(prediction_dist.items()))
             st.plotly_chart(fig, use_container_width=True)
-        
-        with col2:
-            # 예측 분포
-            prediction_dist = self.get_prediction_distribution()
-            
-            if prediction_dist:
-                fig = px.pie(
-                    values=list(prediction_dist.values()),
-                    names=list(prediction_dist.keys()),
-                    title="예측 결과 분포"
-                )
-                st.plotly_chart(fig, use_container_width=True)
 
     def settings_tab(self):
         """설정 탭"""
@@ -1233,124 +1880,166 @@ class CompressorDiagnosisSystem:
     # 유틸리티 메서드들
     def get_system_stats(self):
         """시스템 통계"""
-        stats = {}
-        
-        cursor = self.conn.execute('SELECT COUNT(*) FROM audio_files')
-        stats['total_files'] = cursor.fetchone()[0]
-        
-        cursor = self.conn.execute('SELECT COUNT(*) FROM labels')
-        stats['total_labels'] = cursor.fetchone()[0]
-        
-        cursor = self.conn.execute('SELECT COUNT(*) FROM predictions')
-        stats['total_predictions'] = cursor.fetchone()[0]
-        
-        cursor = self.conn.execute('SELECT COUNT(*) FROM customers')
-        stats['total_customers'] = cursor.fetchone()[0]
-        
-        return stats
+        return dict(_compute_system_stats(_db_mtime()))
 
     def save_customer_info(self, customer_id, company_name, contact_person, email, phone):
         """고객 정보 저장"""
         try:
-            self.conn.execute('''
-                INSERT OR REPLACE INTO customers 
-                (id, company_name, contact_person, email, phone)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (customer_id, company_name, contact_person, email, phone))
-            self.conn.commit()
+            with self.write_transaction() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO customers 
+                    (id, company_name, contact_person, email, phone)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (customer_id, company_name, contact_person, email, phone))
         except Exception as e:
             st.error(f"고객 정보 저장 오류: {e}")
 
     def process_files(self, uploaded_files, customer_id, equipment_id, auto_analysis, auto_prediction, batch_labeling):
-        """파일 처리"""
-        results = []
+        """파일 처리 - 업로드 순서대로 FileResult 목록 반환"""
+        results = [None] * len(uploaded_files)
+        inserts = []  # DB 저장 대상: (index, audio_files 행, audio, sr)
+        os.makedirs("uploads", exist_ok=True)
+        
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            # 파일 저장 후 오디오 디코딩(+ 기본 분석 특징 계산)은 스레드 풀에서 병렬 처리
+            jobs = []
+            for uploaded_file in uploaded_files:
+                file_path = f"uploads/{uploaded_file.name}"
+                try:
+                    with open(file_path, "wb") as f:
+                        f.write(uploaded_file.getbuffer())  # 업로드 버퍼의 memoryview (bytes 복사 없음)
+                    jobs.append((uploaded_file, file_path, executor.submit(self._load_upload, file_path, auto_analysis)))
+                except Exception as e:
+                    jobs.append((uploaded_file, file_path, e))
+            
+            for i, (uploaded_file, file_path, job) in enumerate(jobs):
+                try:
+                    if isinstance(job, Exception):
+                        raise job
+                    
+                    # 오디오 로드
+                    audio, sr, features = job.result()
+                    
+                    # file_id는 DB 저장 후 설정
+                    results[i] = FileResult(uploaded_file.name, '완료', f"{len(audio)/sr:.2f}초", None)
+                    row = (uploaded_file.name, len(audio)/sr, sr, file_path, customer_id, equipment_id, features)
+                    inserts.append((i, row, audio, sr))
+                    
+                except Exception as e:
+                    results[i] = FileResult(uploaded_file.name, f'오류: {e}', '-', '-')
         
-        for uploaded_file in uploaded_files:
+        # AI 예측 (디코딩된 전체 파일 배치) - DB 쓰기 잠금 밖에서 먼저 실행
+        predictions = {}
+        if inserts and auto_prediction and self.ai_enabled:
             try:
-                # 파일 저장
-                file_path = f"uploads/{uploaded_file.name}"
-                os.makedirs("uploads", exist_ok=True)
-                
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getvalue())
-                
-                # 오디오 로드
-                audio, sr = librosa.load(file_path, sr=None, mono=True)
-                
-                # DB 저장
-                cursor = self.conn.execute('''
-                    INSERT INTO audio_files 
-                    (filename, duration, sample_rate, file_path, customer_id, equipment_id)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (uploaded_file.name, len(audio)/sr, sr, file_path, customer_id, equipment_id))
-                
-                file_id = cursor.lastrowid
-                self.conn.commit()
-                
-                result = {
-                    'filename': uploaded_file.name,
-                    'status': '완료',
-                    'duration': f"{len(audio)/sr:.2f}초",
-                    'file_id': file_id
-                }
-                
-                # AI 예측
-                if auto_prediction and self.ai_enabled:
-                    prediction = self.predict_with_ai(audio, sr, file_id)
-                    result['prediction'] = prediction
-                
-                results.append(result)
-                
+                batch = self.ai_manager.predict_batch([(audio, sr) for _, _, audio, sr in inserts])
+                predictions = {i: prediction for (i, _, _, _), prediction in zip(inserts, batch)}
             except Exception as e:
-                results.append({
-                    'filename': uploaded_file.name,
-                    'status': f'오류: {e}',
-                    'duration': '-',
-                    'file_id': '-'
-                })
+                predictions = {i: e for i, _, _, _ in inserts}
+        
+        # DB 저장 (한 번의 executemany) + 예측 저장, 한 번에 커밋 (실패 시 전체 롤백)
+        try:
+            with self.write_transaction():
+                outcomes = self._insert_audio_files([row for _, row, _, _ in inserts]) if inserts else []
+                for (i, _, _, _), outcome in zip(inserts, outcomes):
+                    if isinstance(outcome, Exception):
+                        results[i] = results[i]._replace(status=f'오류: {outcome}', duration='-', file_id='-')
+                        continue
+                    
+                    results[i] = results[i]._replace(file_id=outcome)
+                    
+                    prediction = predictions.get(i)
+                    if isinstance(prediction, Exception):
+                        results[i] = results[i]._replace(prediction=f"❌ AI 예측 오류: {prediction}")
+                    elif prediction is not None:
+                        predicted_label, confidence = prediction
+                        results[i] = results[i]._replace(
+                            prediction=self.record_prediction(outcome, predicted_label, confidence)
+                        )
+                
+                self.flush_predictions()
+        except Exception as e:
+            self._pending_predictions = []
+            for i, _, _, _ in inserts:
+                results[i] = FileResult(results[i].filename, f'오류: {e}', '-', '-')
+        else:
+            # 대량 업로드 후 통계 갱신 (필요한 테이블만 ANALYZE, 실패해도 업로드에는 영향 없음)
+            with db_write_lock():
+                try:
+                    self.conn.execute("PRAGMA optimize")
+                except sqlite3.Error:
+                    pass
         
         return results
 
-    def get_files_list(self):
-        """파일 목록 조회"""
-        cursor = self.conn.execute('''
-            SELECT af.*, c.company_name
-            FROM audio_files af
-            LEFT JOIN customers c ON af.customer_id = c.id
-            ORDER BY af.upload_time DESC
-        ''')
-        
-        columns = ['id', 'filename', 'upload_time', 'duration', 'sample_rate', 
-                  'file_path', 'customer_id', 'equipment_id', 'company_name']
-        data = cursor.fetchall()
-        
-        if data:
-            return pd.DataFrame(data, columns=columns)
-        else:
-            return pd.DataFrame()
+    def _load_upload(self, file_path, auto_analysis):
+        """업로드 파일 디코딩 + (자동 분석 시) 기본 분석 특징 BLOB 계산 - 워커 스레드에서 실행"""
+        audio, sr = fast_load(file_path)
+        features = self.pack_basic_features(self.perform_basic_analysis(audio, sr)) if auto_analysis else None
+        return audio, sr, features
 
-    def get_dataset_stats(self):
-        """데이터셋 통계"""
-        cursor = self.conn.execute('SELECT COUNT(*) FROM labels')
-        total_labels = cursor.fetchone()[0]
+    def _insert_audio_files(self, rows):
+        """audio_files 일괄 INSERT - 행별 file_id (실패한 행은 예외 객체) 목록 반환
         
-        cursor = self.conn.execute('SELECT COUNT(DISTINCT label_type) FROM labels')
-        unique_classes = cursor.fetchone()[0]
+        executemany는 lastrowid를 돌려주지 않으므로 쓰기 잠금을 잡은 뒤 id를 직접 할당.
+        중복 파일명 등으로 배치가 실패하면 해당 배치만 되돌리고 파일별 INSERT로 처리.
+        """
+        conn = self.conn
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
         
-        cursor = self.conn.execute('''
-            SELECT label_type, COUNT(*) as count
-            FROM labels
-            GROUP BY label_type
-        ''')
+        conn.execute("SAVEPOINT audio_files_batch")
+        try:
+            first_id = conn.execute('''
+                SELECT MAX(IFNULL((SELECT seq FROM sqlite_sequence WHERE name = 'audio_files'), 0),
+                           IFNULL((SELECT MAX(id) FROM audio_files), 0))
+            ''').fetchone()[0] + 1
+            file_ids = list(range(first_id, first_id + len(rows)))
+            conn.executemany('''
+                INSERT INTO audio_files 
+                (id, filename, duration, sample_rate, file_path, customer_id, equipment_id, features)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(file_id, *row) for file_id, row in zip(file_ids, rows)])
+            conn.execute("RELEASE audio_files_batch")
+            return file_ids
+        except sqlite3.IntegrityError:
+            conn.execute("ROLLBACK TO audio_files_batch")
+            conn.execute("RELEASE audio_files_batch")
+        
+        outcomes = []
+        cursor = conn.cursor()
+        for row in rows:
+            try:
+                cursor.execute(INSERT_AUDIO_FILE_SQL, row)
+                outcomes.append(cursor.lastrowid)
+            except sqlite3.Error as e:
+                outcomes.append(e)
+        return outcomes
+
+    def get_files_list(self, page=0):
+        """파일 목록 조회 (최신순, FILES_PAGE_SIZE 단위 페이지)"""
+        with read_conn() as conn:
+            return pd.read_sql_query('''
+                SELECT af.id, af.filename, af.upload_time, af.duration, af.sample_rate,
+                       af.file_path, af.customer_id, af.equipment_id, c.company_name
+                FROM audio_files af
+                LEFT JOIN customers c ON af.customer_id = c.id
+                ORDER BY af.upload_time DESC
+                LIMIT ? OFFSET ?
+            ''', conn, params=(FILES_PAGE_SIZE, page * FILES_PAGE_SIZE))
+
+    def get_dataset_stats(self):
+        """데이터셋 통계"""
+        total_labels, unique_classes, label_counts = _compute_dataset_stats(_db_mtime())
         
         class_distribution = {}
         class_counts = []
         
-        for row in cursor.fetchall():
-            if row[0]:
-                label_name = self.labels.get(row[0], row[0])
-                class_distribution[label_name] = row[1]
-                class_counts.append(row[1])
+        for label_type, count in label_counts:
+            if label_type:
+                label_name = self.labels.get(label_type, label_type)
+                class_distribution[label_name] = count
+                class_counts.append(count)
         
         min_count = min(class_counts) if class_counts else 0
         max_count = max(class_counts) if class_counts else 0
@@ -1365,13 +2054,7 @@ class CompressorDiagnosisSystem:
 
     def get_dashboard_stats(self):
         """대시보드 통계"""
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        cursor = self.conn.execute('''
-            SELECT COUNT(*) FROM predictions 
-            WHERE DATE(prediction_time) = ?
-        ''', (today,))
-        today_diagnoses = cursor.fetchone()[0]
+        today_diagnoses = _count_predictions_on(_db_mtime(), datetime.now().date())
         
         return {
             'today_diagnoses': today_diagnoses,
@@ -1383,24 +2066,15 @@ class CompressorDiagnosisSystem:
 
     def get_daily_stats(self):
         """일별 통계"""
-        dates = pd.date_range(end=datetime.now(), periods=14, freq='D')
-        counts = np.random.randint(0, 12, size=14)
-        
-        return pd.DataFrame({'date': dates, 'count': counts})
+        return _mock_daily_stats(datetime.now().strftime('%Y-%m-%d-%H'))
 
     def get_prediction_distribution(self):
         """예측 분포"""
-        cursor = self.conn.execute('''
-            SELECT predicted_label, COUNT(*) as count
-            FROM predictions
-            GROUP BY predicted_label
-        ''')
-        
         distribution = {}
-        for row in cursor.fetchall():
-            if row[0]:
-                label_name = self.labels.get(row[0], row[0])
-                distribution[label_name] = row[1]
+        for predicted_label, count in _load_prediction_counts(_db_mtime()):
+            if predicted_label:
+                label_name = self.labels.get(predicted_label, predicted_label)
+                distribution[label_name] = count
         
         if not distribution:
             distribution = {
@@ -1415,15 +2089,19 @@ class CompressorDiagnosisSystem:
     def backup_database(self):
         """데이터베이스 백업"""
         try:
-            import shutil
-            
             backup_dir = "backups"
             os.makedirs(backup_dir, exist_ok=True)
             
             backup_filename = f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
             backup_path = os.path.join(backup_dir, backup_filename)
             
-            shutil.copy2('compressor_system.db', backup_path)
+            # SQLite 온라인 백업 API - 쓰기 중에도 커밋된 내용의 일관된 스냅샷 (WAL 내용 포함)
+            dst = sqlite3.connect(backup_path)
+            try:
+                with read_conn() as conn:
+                    conn.backup(dst)
+            finally:
+                dst.close()
             
             return {'success': True, 'path': backup_path}
         except Exception as e:
@@ -1432,15 +2110,17 @@ class CompressorDiagnosisSystem:
     def cleanup_old_data(self):
         """오래된 데이터 정리"""
         try:
-            import glob
             cleaned_count = 0
             
-            for file_path in glob.glob("temp_*"):
-                try:
-                    os.remove(file_path)
-                    cleaned_count += 1
-                except:
-                    pass
+            # 디렉토리를 한 번만 순회 (DirEntry가 파일 종류를 캐시하므로 추가 stat 없음)
+            with os.scandir('.') as entries:
+                for entry in entries:
+                    if entry.name.startswith('temp_') and entry.is_file(follow_symlinks=False):
+                        try:
+                            os.unlink(entry.path)
+                            cleaned_count += 1
+                        except OSError:
+                            pass
             
             return cleaned_count
         except:
@@ -1450,12 +2130,11 @@ class CompressorDiagnosisSystem:
         """데이터 무결성 검증"""
         issues = []
         
-        cursor = self.conn.execute('''
-            SELECT COUNT(*) FROM labels l
-            LEFT JOIN audio_files af ON l.file_id = af.id
-            WHERE af.id IS NULL
-        ''')
-        orphan_labels = cursor.fetchone()[0]
+        with read_conn() as conn:
+            orphan_labels = conn.execute('''
+                SELECT COUNT(*) FROM labels l
+                WHERE NOT EXISTS (SELECT 1 FROM audio_files af WHERE af.id = l.file_id)
+            ''').fetchone()[0]
         
         if orphan_labels > 0:
             issues.append(f"{orphan_labels}개의 고아 라벨")
@@ -1469,11 +2148,6 @@ class CompressorDiagnosisSystem:
         """시스템 설정 저장"""
         st.session_state.system_settings = settings
 
-    def __del__(self):
-        """데이터베이스 연결 종료"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
-
 # 메인 실행 함수
 def main():
     """메인 실행 함수"""